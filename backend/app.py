@@ -1,16 +1,12 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, has_app_context, Response, stream_with_context
 from flask_cors import CORS
-import google.generativeai as genai
-from PIL import Image
-import mysql.connector
 from mysql.connector import Error
 from datetime import datetime
 import re
-import PyPDF2
 import requests
 from bs4 import BeautifulSoup
 import json
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import re
 from urllib.parse import quote
 import time
@@ -19,25 +15,63 @@ from requests.packages.urllib3.util.retry import Retry
 import bcrypt
 
 app = Flask(__name__)
-CORS(app,resources={r"/*": {"origins": "*"}})
+CORS(app,resources={r"/*": {"origins": "*"}}, expose_headers=['X-Next-Cursor', 'Server-Timing'])
 
 import os
-
-db_config = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'user': os.getenv('DB_USER', 'root'),
-    'password': os.getenv('DB_PASSWORD', 'root'),
-    'database': os.getenv('DB_NAME', 'medicine')
-}
-
-# Function to create MySQL connection
+import hmac
+from db import db_pool
+from jobs import JobQueue, QueueFullError
+from medicine_cache import MedicineKnowledgeCache
+from llm import LLMRegistry
+from sessions import ChatSessionStore, ConversationMemory
+from pipeline import Pipeline, PipelineTimeout, StageError, server_timing
+from inventory_match import InventoryMatcher, normalize_drug_name, render_comparison
+from banned_drugs import BannedList
+from image_prep import PROFILES as IMAGE_PROFILES, image_blob, open_upload, prepare_image
+from pdf_ingest import PdfPages
+from uploads import MAX_UPLOAD_BYTES, ImageUpload, MemoryTracker, SpooledRequest, UploadError
+from image_cache import ImageResultCache, image_key
+from streaming import SENTENCE_BOUNDARY, format_citation, sse_event, stream_sentences
+
+# Bodies over MAX_UPLOAD_BYTES are refused while they are read; uploaded files
+# past UPLOAD_SPOOL_THRESHOLD are spooled to temp files instead of memory
+app.request_class = SpooledRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
+# Check out a pooled MySQL connection; close() hands it back to the pool
 def create_connection():
     try:
-        connection = mysql.connector.connect(**db_config)
-        return connection
+        connection = db_pool.get_connection()
     except Error as e:
         print(f"Error connecting to MySQL: {e}")
         return None
+    if has_app_context():
+        g.setdefault('db_connections', []).append(connection)
+    return connection
+
+# Return any connection a route forgot to close (e.g. after an early error)
+@app.teardown_appcontext
+def release_connections(exception=None):
+    for connection in g.pop('db_connections', []):
+        connection.close()
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    return jsonify({'error': f'Upload is larger than {MAX_UPLOAD_BYTES} bytes'}), 413
+
+# Peak memory of the endpoints that decode uploaded images, reported in /metrics
+MEMORY_TRACKED_ENDPOINTS = {'interpret_prescription', 'interpret_batch', 'analyze_health_image'}
+request_memory = MemoryTracker()
+
+@app.before_request
+def start_memory_tracking():
+    if request.endpoint in MEMORY_TRACKED_ENDPOINTS:
+        g.rss_started = request_memory.start()
+
+@app.teardown_request
+def record_memory(exception=None):
+    if 'rss_started' in g:
+        request_memory.record(request.endpoint, g.pop('rss_started'))
     
 @app.route('/register', methods=['POST'])
 def register_user():
@@ -78,63 +112,17 @@ def register_user():
         if connection.is_connected():
             cursor.close()
             connection.close()
-def load_banned_drugs():
-    banned_drugs = set()
-    banned_combinations = []
-    pdf_path = 'banned_drugs.pdf'
-    
-    with open(pdf_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        for page in pdf_reader.pages:
-            text = page.extract_text()
-            # Extract individual drugs
-            drugs = re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', text)
-            banned_drugs.update(drugs)
-            # Extract drug combinations
-            combinations = re.findall(r'Fixed dose combinations of (.+?)\.', text)
-            banned_combinations.extend(combinations)
-    
-    return banned_drugs, banned_combinations
-
-banned_drugs, banned_combinations = load_banned_drugs()
+# Rebuilt in the background when banned_drugs.pdf changes
+banned_list = BannedList()
+banned_list.watch()
 
     
 class HealthAdvisor:
-    def __init__(self, api_key):
-        genai.configure(api_key=api_key)
-        
-        generation_config = {
-            "temperature": 0.7,
-            "top_p": 1,
-            "top_k": 32,
-            "max_output_tokens": 4096,
-        }
-        
-        safety_settings = [
-            {
-                "category": "HARM_CATEGORY_HARASSMENT",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-            {
-                "category": "HARM_CATEGORY_HATE_SPEECH",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-            {
-                "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-            {
-                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-        ]
-        
-        self.model = genai.GenerativeModel(model_name="gemini-1.5-pro",
-                                           generation_config=generation_config,
-                                           safety_settings=safety_settings)
+    def __init__(self, llm):
+        self.model = llm.model('advisor')
 
-    def get_health_advice(self, user_input):
-        prompt = f"""
+    def build_prompt(self, user_input):
+        return f"""
         You are an AI health advisor. Follow this conversation flow:
         1. If this is the first message, ask about specific symptoms
         2. Based on symptoms, ask relevant follow-up questions about:
@@ -155,6 +143,8 @@ class HealthAdvisor:
         For each piece of advice, include a citation with a link to a reputable medical source.
         """
 
+    def get_health_advice(self, user_input):
+        prompt = self.build_prompt(user_input)
         try:
             response = self.model.generate_content(prompt)
             return self.process_response(response.text)
@@ -162,59 +152,38 @@ class HealthAdvisor:
             print(f"Error generating health advice: {e}")
             return "I'm sorry, I couldn't generate health advice at the moment. Please try again later."
 
+    def stream_health_advice(self, user_input):
+        return stream_sentences(self.model, self.build_prompt(user_input))
+
     def process_response(self, text):
-        # Split the text into sentences
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        
-        # Process each sentence to format citations
-        processed_sentences = []
-        for sentence in sentences:
-            match = re.search(r'\[Source: (.*?) \((https?://\S+)\)\]', sentence)
-            if match:
-                title, link = match.groups()
-                formatted_citation = f'[<a href="{link}" target="_blank">{title}</a>]'
-                sentence = re.sub(r'\[Source: .*?\]', formatted_citation, sentence)
-            processed_sentences.append(sentence)
-        
-        # Join the processed sentences back into a single text
-        return ' '.join(processed_sentences)
+        # Split the text into sentences and format the citations in each
+        sentences = SENTENCE_BOUNDARY.split(text)
+        return ' '.join(format_citation(sentence) for sentence in sentences)
     
 class MentalHealth:
-    def __init__(self, api_key):
-        genai.configure(api_key=api_key)
-        
-        generation_config = {
-            "temperature": 0.7,
-            "top_p": 1,
-            "top_k": 32,
-            "max_output_tokens": 4096,
-        }
-        
-        safety_settings = [
-            {
-                "category": "HARM_CATEGORY_HARASSMENT",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-            {
-                "category": "HARM_CATEGORY_HATE_SPEECH",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-            {
-                "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-            {
-                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-        ]
-        
-        self.model = genai.GenerativeModel(model_name="gemini-1.5-pro",
-                                           generation_config=generation_config,
-                                           safety_settings=safety_settings)
+    def __init__(self, llm):
+        self.model = llm.model('advisor')
+        self.summary_model = llm.model('memory')
+        # Keeps session prompts bounded by folding old turns into a summary
+        self.memory = ConversationMemory(self.summarize_history)
 
-    def get_mentalhealth_advice(self, user_input, conversation_history):
+    def summarize_history(self, summary, transcript):
         prompt = f"""
+        You maintain the running summary of a supportive mental health conversation.
+        Update the summary with the new turns below. Keep the user's concerns, feelings,
+        relevant life details, coping strategies already discussed and any safety risks.
+        Write at most 150 words in the third person.
+
+        Current summary:
+        {summary or "None yet"}
+
+        New turns:
+        {transcript}
+        """
+        return self.summary_model.generate_content(prompt).text
+
+    def build_prompt(self, user_input, conversation_history):
+        return f"""
         You are an AI-based mental health therapist. Your role is to provide supportive, empathetic responses to users seeking help with mental health issues. Always maintain a professional and caring tone. If a user expresses thoughts of self-harm or suicide, advise them to seek immediate professional help and provide resources like suicide prevention hotlines. Remember that you're not a replacement for a human therapist, but a supportive tool to help users explore their thoughts and feelings.
 
         Conversation history:
@@ -223,6 +192,8 @@ class MentalHealth:
         User: {user_input}
         """
 
+    def get_mentalhealth_advice(self, user_input, conversation_history):
+        prompt = self.build_prompt(user_input, conversation_history)
         try:
             response = self.model.generate_content(prompt)
             return self.process_response(response.text)
@@ -230,71 +201,61 @@ class MentalHealth:
             print(f"Error generating health advice: {e}")
             return "I'm sorry, I couldn't generate health advice at the moment. Please try again later."
 
+    def stream_mentalhealth_advice(self, user_input, conversation_history):
+        return stream_sentences(self.model, self.build_prompt(user_input, conversation_history))
+
+    # Answer one turn of a server-side session and remember it
+    def chat(self, session, user_input):
+        with session.lock:
+            prompt = self.build_prompt(user_input, self.memory.context(session))
+            try:
+                response = self.model.generate_content(prompt)
+                reply = self.process_response(response.text)
+            except Exception as e:
+                print(f"Error generating health advice: {e}")
+                return "I'm sorry, I couldn't generate health advice at the moment. Please try again later."
+            session.add_turn('user', user_input)
+            session.add_turn('bot', reply)
+            self.memory.compact(session)
+            return reply
+
+    def stream_chat(self, session, user_input):
+        with session.lock:
+            prompt = self.build_prompt(user_input, self.memory.context(session))
+            parts = []
+            for text in stream_sentences(self.model, prompt):
+                parts.append(text)
+                yield text
+            session.add_turn('user', user_input)
+            session.add_turn('bot', ''.join(parts))
+            self.memory.compact(session)
+
     def process_response(self, text):
-        # Split the text into sentences
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        
-        # Process each sentence to format citations
-        processed_sentences = []
-        for sentence in sentences:
-            match = re.search(r'\[Source: (.*?) \((https?://\S+)\)\]', sentence)
-            if match:
-                title, link = match.groups()
-                formatted_citation = f'[<a href="{link}" target="_blank">{title}</a>]'
-                sentence = re.sub(r'\[Source: .*?\]', formatted_citation, sentence)
-            processed_sentences.append(sentence)
-        
-        # Join the processed sentences back into a single text
-        return ' '.join(processed_sentences)
+        # Split the text into sentences and format the citations in each
+        sentences = SENTENCE_BOUNDARY.split(text)
+        return ' '.join(format_citation(sentence) for sentence in sentences)
         
 class PrescriptionInterpreter:
-    def __init__(self, api_key):
-        genai.configure(api_key=api_key)
-        
-        generation_config = {
-            "temperature": 0.4,
-            "top_p": 1,
-            "top_k": 32,
-            "max_output_tokens": 4096,
-        }
-        
-        safety_settings = [
-            {
-                "category": "HARM_CATEGORY_HARASSMENT",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-            {
-                "category": "HARM_CATEGORY_HATE_SPEECH",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-            {
-                "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-            {
-                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-        ]
-        
-        self.model = genai.GenerativeModel(
-            model_name="gemini-1.5-pro",
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
+    # Interpretations saying the prescription couldn't be read
+    NO_TEXT = "Unable to extract text from the image."
+    NOT_INTERPRETED = "Unable to interpret the prescription content."
+    UNREADABLE = "Unable to interpret the prescription. Please ensure the image contains clear prescription information."
+
+    def __init__(self, llm):
+        self.model = llm.model('prescription')
+        # Answers with JSON matching PRESCRIPTION_SCHEMA
+        self.structured_model = llm.model('prescription_structured')
 
     def extract_text_from_image(self, image):
+        # image is a PreparedImage, or a PIL image that is prepared here
         try:
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
             # Create a prompt for the image analysis
             prompt = "Please extract and read all text from this prescription image, including medication names, dosages, and instructions."
             
             # Generate content with both image and text prompt
             response = self.model.generate_content([
                 prompt,
-                image
+                image_blob(image, 'prescription')
             ])
             
             if response.text:
@@ -305,12 +266,14 @@ class PrescriptionInterpreter:
             return None
 
     def interpret_prescription(self, image):
+        # First extract text from image, then interpret it
+        return self.interpret_text(self.extract_text_from_image(image))
+
+    def interpret_text(self, extracted_text):
         try:
-            # First extract text from image
-            extracted_text = self.extract_text_from_image(image)
             if not extracted_text:
                 return {
-                    "interpretation": "Unable to extract text from the image.",
+                    "interpretation": self.NO_TEXT,
                     "warnings": []
                 }
 
@@ -338,22 +301,102 @@ class PrescriptionInterpreter:
             
             if not response.text:
                 return {
-                    "interpretation": "Unable to interpret the prescription content.",
+                    "interpretation": self.NOT_INTERPRETED,
                     "warnings": []
                 }
 
             return {
                 "interpretation": response.text,
-                "warnings": []
+                "warnings": banned_list.check(extracted_text)
             }
 
         except Exception as e:
             print(f"Error in interpret_prescription: {e}")
             return {
-                "interpretation": "Unable to interpret the prescription. Please ensure the image contains clear prescription information.",
+                "interpretation": self.UNREADABLE,
                 "warnings": []
             }
 
+    def extract_structured(self, image):
+        # Read and structure the prescription in a single model call
+        try:
+            prompt = "Read this prescription image and extract the patient name, date, each prescribed medication with its dosage, frequency and duration, any special instructions and the doctor's name. Use null for anything that is not on the prescription."
+
+            response = self.structured_model.generate_content([
+                prompt,
+                image_blob(image, 'prescription')
+            ])
+            return json.loads(response.text)
+        except Exception as e:
+            print(f"Error extracting structured prescription: {e}")
+            return None
+
+    def render_prescription(self, prescription):
+        # Same sections the two-call interpretation asks the model for
+        lines = [
+            f"**Patient Name:** {prescription.get('patient') or 'Not available'}",
+            f"**Date of Prescription:** {prescription.get('date') or 'Not available'}",
+            "**Medications:**"
+        ]
+        for medication in prescription.get('medications') or []:
+            details = [f"{label}: {medication[key]}" for key, label in
+                       (('dosage', 'Dosage'), ('frequency', 'Frequency'), ('duration', 'Duration'))
+                       if medication.get(key)]
+            lines.append(f"* **{medication.get('name')}**" + (f" - {', '.join(details)}" if details else ''))
+        lines.append(f"**Special Instructions:** {prescription.get('instructions') or 'None'}")
+        lines.append(f"**Doctor's Name:** {prescription.get('doctor') or 'Not available'}")
+        return '\n'.join(lines)
+
+    def merge_prescriptions(self, prescriptions):
+        # One prescription out of several pages. The first page naming the
+        # patient, date or doctor wins. Medications are de-duplicated by
+        # normalized name unless their dosages differ; later pages fill in
+        # details earlier ones left out.
+        merged = {'patient': None, 'date': None, 'medications': [], 'instructions': None, 'doctor': None}
+        instructions = []
+        for prescription in prescriptions:
+            for field in ('patient', 'date', 'doctor'):
+                merged[field] = merged[field] or prescription.get(field)
+            if prescription.get('instructions') and prescription['instructions'] not in instructions:
+                instructions.append(prescription['instructions'])
+            for medication in prescription.get('medications') or []:
+                if not medication.get('name'):
+                    continue
+                name = normalize_drug_name(medication['name']) or medication['name'].lower()
+                dosage = ''.join((medication.get('dosage') or '').lower().split())
+                for existing in merged['medications']:
+                    existing_dosage = ''.join((existing.get('dosage') or '').lower().split())
+                    if (normalize_drug_name(existing['name']) or existing['name'].lower()) == name and (
+                            not dosage or not existing_dosage or dosage == existing_dosage):
+                        for field, value in medication.items():
+                            if value and not existing.get(field):
+                                existing[field] = value
+                        break
+                else:
+                    merged['medications'].append(dict(medication))
+        merged['instructions'] = ' '.join(instructions) or None
+        return merged
+
+    def structured_result(self, prescription):
+        if not prescription:
+            return {
+                "interpretation": self.UNREADABLE,
+                "prescription": None,
+                "warnings": []
+            }
+        interpretation = self.render_prescription(prescription)
+        return {
+            "interpretation": interpretation,
+            "prescription": prescription,
+            "warnings": banned_list.check(interpretation)
+        }
+
+    def interpret_structured(self, image):
+        return self.structured_result(self.extract_structured(image))
+
+    def interpreted(self, result):
+        return result['interpretation'] not in (self.NO_TEXT, self.NOT_INTERPRETED, self.UNREADABLE)
+
     def compare_medicines(self, interpretation, inventory_text):
         try:
             prompt = f"""
@@ -371,12 +414,45 @@ class PrescriptionInterpreter:
             Format the response clearly with "Available:" and "Not Available:" sections.
             """
 
-            response = self.model.generate_content(prompt)
-            return response.text
+            return self.model.generate_text(prompt, cache_site='inventory_compare')
         except Exception as e:
             print(f"Error comparing medicines: {e}")
             return "Unable to compare medicines with inventory."
 
+    def match_unmatched(self, medicines, inventory_text):
+        # Model fallback for names string matching couldn't place, e.g. a
+        # brand name prescribed for a generic in the inventory
+        prompt = f"""
+        For each prescribed medicine below, find the item in the patient's inventory that is the same medicine (same active ingredient, possibly under a brand or generic name).
+
+        Prescribed medicines:
+        {json.dumps(medicines)}
+
+        Current inventory:
+        {inventory_text}
+
+        Respond only with a JSON object mapping each prescribed medicine to the exact inventory item name, or null if none of the items is the same medicine.
+        """
+
+        try:
+            response = self.model.generate_text(prompt, cache_site='inventory_compare')
+            cleaned_response = response[response.find('{'):response.rfind('}') + 1]
+            return json.loads(cleaned_response)
+        except Exception as e:
+            print(f"Error matching medicines with the model: {e}")
+            return {}
+
+    def compare_inventory(self, medicines, inventory):
+        # Local matching first; the model only sees what it couldn't place
+        results = inventory_matcher.match(medicines, inventory)
+        unmatched = [result['medicine'] for result in results if result['status'] == 'unmatched']
+        if unmatched and inventory:
+            resolved = self.match_unmatched(unmatched, format_inventory(inventory))
+            results = [inventory_matcher.resolve(result, resolved[result['medicine']], inventory)
+                       if result['status'] == 'unmatched' and resolved.get(result['medicine']) else result
+                       for result in results]
+        return results
+
     def suggest_ayurvedic_alternatives(self, prescription):
         prompt = f"""
         As an Ayurvedic expert, analyze the following prescription and suggest Ayurvedic alternatives for each medicine. 
@@ -397,61 +473,31 @@ class PrescriptionInterpreter:
         """
 
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            return self.model.generate_text(prompt, cache_site='ayurvedic')
         except Exception as e:
             print(f"Error generating Ayurvedic alternatives: {e}")
             return "Unable to suggest Ayurvedic alternatives. Please try again later."
 
 api_key = ""  # Replace with your actual API key
-interpreter = PrescriptionInterpreter(api_key)
-health_advisor = HealthAdvisor(api_key)
-mental_health = MentalHealth(api_key)
+# Gemini models are configured once per process and shared by every request
+llm = LLMRegistry(api_key)
+interpreter = PrescriptionInterpreter(llm)
+inventory_matcher = InventoryMatcher()
+health_advisor = HealthAdvisor(llm)
+mental_health = MentalHealth(llm)
+# Server-side conversation state for /mental_chat and /api/chat
+chat_sessions = ChatSessionStore()
+# Interpretations and analyses of recently uploaded images, reused for
+# re-uploads of the same file or, for health photos, a near-identical one
+image_results = ImageResultCache()
 
-from PIL import Image
-import io
 import base64
 
 class HealthImageAnalyzer:
-    def __init__(self, api_key):
-        genai.configure(api_key=api_key)
-        
-        generation_config = {
-            "temperature": 0.3,
-            "top_p": 1,
-            "top_k": 32,
-            "max_output_tokens": 4096,
-        }
-        
-        safety_settings = [
-            {
-                "category": "HARM_CATEGORY_HARASSMENT",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-            {
-                "category": "HARM_CATEGORY_HATE_SPEECH",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-            {
-                "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-            {
-                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                "threshold": "BLOCK_ONLY_HIGH"
-            },
-        ]
-        
-        self.model = genai.GenerativeModel(
-            model_name="gemini-1.5-pro",
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
+    def __init__(self, llm):
+        self.model = llm.model('image_analysis')
 
     def analyze_image(self, image, caption=""):
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-            
         prompt = f"""
         Analyze this medical image with the following context/description:
         {caption if caption else "No description provided"}
@@ -473,7 +519,7 @@ class HealthImageAnalyzer:
         """
         
         try:
-            response = self.model.generate_content([image, prompt])
+            response = self.model.generate_content([image_blob(image, 'health'), prompt])
             result = response.text
             return self.parse_response(result)
         except Exception as e:
@@ -505,6 +551,8 @@ class HealthImageAnalyzer:
                 "seek_medical_attention": False
             }
 
+health_image_analyzer = HealthImageAnalyzer(llm)
+
 @app.route('/analyze-health-image', methods=['POST'])
 def analyze_health_image():
     if 'image' not in request.files:
@@ -512,19 +560,168 @@ def analyze_health_image():
     
     image_file = request.files['image']
     caption = request.form.get('caption', '')
+    user_id = request.form.get('userId')
     
     try:
-        image = Image.open(image_file)
-        analyzer = HealthImageAnalyzer(api_key)
-        result = analyzer.analyze_image(image, caption)
+        upload = ImageUpload(image_file)
+        image = open_upload(upload, 'health')
+    except UploadError as e:
+        print(f"Error opening image: {e}")
+        return jsonify({'error': str(e)}), e.status
+
+    try:
+        prepared = prepare_image(image, 'health', original=upload)
+        # Analyses are only reused for the user who uploaded the image
+        scope = f"health:{user_id}:{caption.strip()}" if user_id else None
+        key = image_key(upload.digest, prepared.image)
+        result = image_results.get(scope, key) if scope else None
+        if result is None:
+            result = health_image_analyzer.analyze_image(prepared, caption)
+            # Only complete analyses are reused, not the fallback answers
+            if scope and result.get('urgency') in ('low', 'medium', 'high'):
+                image_results.put(scope, key, result)
         
-        return jsonify(result), 200
+        response = jsonify(result)
+        response.headers['Server-Timing'] = server_timing(
+            {f"prep_{stage}": duration for stage, duration in prepared.timings.items()})
+        return response, 200
     except Exception as e:
         print(f"Error processing image: {e}")
         return jsonify({
             'error': 'Failed to process image',
             'details': str(e)
         }), 500
+# The frontend gives up on /interpret after 120 seconds
+INTERPRET_DEADLINE = float(os.getenv('INTERPRET_DEADLINE', '110'))
+# 'two_call' OCRs the image and then interprets the text; 'structured' reads
+# the image once into PRESCRIPTION_SCHEMA. Requests can pick either with `mode`.
+# Only structured prescriptions name their medicines, which the inventory is
+# matched against locally, so it is the default.
+INTERPRET_MODES = ('two_call', 'structured')
+INTERPRET_MODE = os.getenv('INTERPRET_MODE', 'structured')
+
+def fetch_inventory(user_id):
+    connection = create_connection()
+    if connection is None:
+        raise Error(msg='Database connection failed')
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        query = "SELECT name, quantity, expiryDate FROM medicines WHERE userId = %s"
+        cursor.execute(query, (user_id,))
+        return cursor.fetchall()
+    finally:
+        if cursor is not None:
+            cursor.close()
+        connection.close()
+
+def format_inventory(inventory_medicines):
+    return "\n".join([f"{med['name']} (Quantity: {med['quantity']}, Expires: {med['expiryDate']})" for med in inventory_medicines])
+
+def lookup_interpretation(scope, digest, prepared):
+    # Returns (cache key, {'ocr', 'interpret'} stored for this file or None).
+    # Another prescription on the same letterhead hashes like a re-shot of
+    # this one, so only the same file is reused. The banned list may have
+    # changed since, so the warnings are checked again.
+    key = image_key(digest, prepared.image)
+    hit = image_results.get(scope, key, near=False)
+    if hit is not None:
+        interpretation = hit['interpret']
+        warnings = banned_list.check(hit['ocr'] or interpretation['interpretation'])
+        hit = {'ocr': hit['ocr'], 'interpret': dict(interpretation, warnings=warnings)}
+    return key, hit
+
+def interpret_image(mode, scope, results):
+    key, hit = results['lookup']
+    if hit is not None:
+        return hit['interpret']
+    if mode == 'structured':
+        text = None
+        interpretation = interpreter.interpret_structured(results['preprocess'])
+    else:
+        text = results['ocr']
+        interpretation = interpreter.interpret_text(text)
+    if interpreter.interpreted(interpretation):
+        image_results.put(scope, key, {'ocr': text, 'interpret': interpretation})
+    return interpretation
+
+def compare_with_inventory(interpretation, inventory):
+    # Returns (comparison text, per-medicine matches). Structured prescriptions
+    # are matched locally; free-text ones still need the model to find the names.
+    prescription = interpretation.get('prescription')
+    if prescription is None:
+        return interpreter.compare_medicines(interpretation, format_inventory(inventory)), None
+    medicines = [medication['name'] for medication in prescription.get('medications') or [] if medication.get('name')]
+    matches = interpreter.compare_inventory(medicines, inventory)
+    return render_comparison(matches), matches
+
+# Progress events of asynchronous /interpret jobs, by the stage that finished
+STAGE_EVENTS = {'ocr': 'ocr_done', 'interpret': 'interpreted', 'compare': 'compared'}
+interpret_queue = JobQueue(
+    'interpret',
+    max_workers=int(os.getenv('INTERPRET_JOB_WORKERS', '4')),
+    max_pending=int(os.getenv('INTERPRET_JOB_MAX_PENDING', '32')),
+    result_ttl=int(os.getenv('INTERPRET_JOB_TTL', '600'))
+)
+
+def stage_event(name, result):
+    if name == 'ocr':
+        return {'text': result}
+    if name == 'interpret':
+        return {'prescription_interpretation': result}
+    comparison, matches = result
+    return {'inventory_comparison': comparison, 'inventory_matches': matches}
+
+def run_interpretation(user_id, mode, image, upload, on_stage=None):
+    # Returns (response body, HTTP status, stage timings)
+    # The inventory lookup doesn't depend on the model, so it runs alongside OCR
+    # Interpretations are only reused for the user who uploaded the image
+    scope = f"prescription:{mode}:{user_id}"
+    pipeline = (Pipeline(deadline=INTERPRET_DEADLINE)
+                .add('inventory', lambda _: fetch_inventory(user_id))
+                .add('preprocess', lambda _: prepare_image(image, 'prescription', original=upload))
+                .add('lookup', lambda r: lookup_interpretation(scope, upload.digest, r['preprocess']), deps=['preprocess']))
+    if mode == 'structured':
+        pipeline.add('interpret', lambda r: interpret_image(mode, scope, r), deps=['preprocess', 'lookup'])
+    else:
+        (pipeline.add('ocr', lambda r: r['lookup'][1]['ocr'] if r['lookup'][1]
+                      else interpreter.extract_text_from_image(r['preprocess']), deps=['preprocess', 'lookup'])
+                 .add('interpret', lambda r: interpret_image(mode, scope, r), deps=['ocr', 'lookup']))
+    pipeline.add('compare', lambda r: compare_with_inventory(r['interpret'], r['inventory']),
+                 deps=['interpret', 'inventory'])
+
+    try:
+        results, timings = pipeline.run(on_stage)
+    except PipelineTimeout as e:
+        print(f"Interpretation timed out: {e}")
+        return {'error': 'Prescription interpretation timed out. Please try again.'}, 504, e.timings
+    except StageError as e:
+        print(f"Error during interpretation: {e}")
+        if e.stage == 'inventory':
+            return {'error': f'Failed to fetch inventory: {str(e.error)}'}, 500, e.timings
+        return {'error': f'Error during interpretation: {str(e.error)}'}, 500, e.timings
+
+    print(f"Prescription interpreted and compared with {len(results['inventory'])} inventory medicines")
+    comparison, matches = results['compare']
+    body = {
+        'prescription_interpretation': results['interpret'],
+        'inventory_comparison': comparison
+    }
+    if matches is not None:
+        body['inventory_matches'] = matches
+    timings.update((f"prep_{stage}", duration) for stage, duration in results['preprocess'].timings.items())
+    return body, 200, timings
+
+def interpret_job(job, user_id, mode, image, upload):
+    def on_stage(name, result, duration):
+        if name in STAGE_EVENTS:
+            job.publish(STAGE_EVENTS[name], dict(stage_event(name, result), ms=duration))
+
+    body, status, timings = run_interpretation(user_id, mode, image, upload, on_stage)
+    if status != 200:
+        raise RuntimeError(body['error'])
+    return dict(body, timings=timings)
+
 @app.route('/interpret', methods=['POST'])
 def interpret_prescription():
     print("Received request for prescription interpretation")
@@ -536,60 +733,195 @@ def interpret_prescription():
     user_id = request.form.get('userId')
     user_email = request.form.get('userEmail')
     username = request.form.get('username')
+    mode = request.form.get('mode', INTERPRET_MODE)
+    # async=1 answers 202 with a job to poll instead of waiting for the result
+    run_async = request.form.get('async', request.args.get('async', '0')) in ('1', 'true')
     
     print(f"Received data - User ID: {user_id}, Email: {user_email}, Name: {username}")
     
     if not user_id:
         print("No user ID provided")
         return jsonify({'error': 'User ID is required'}), 400
+
+    if mode not in INTERPRET_MODES:
+        return jsonify({'error': f"mode must be one of: {', '.join(INTERPRET_MODES)}"}), 400
     
     try:
-        image = Image.open(image_file)
+        upload = ImageUpload(image_file)
+        if run_async:
+            upload.detach()
+        # Decode now: the pipeline reads the image from worker threads
+        image = open_upload(upload, 'prescription')
         print("Image opened successfully")
-    except Exception as e:
+    except UploadError as e:
         print(f"Error opening image: {str(e)}")
-        return jsonify({'error': 'Unable to open image file'}), 400
-    
-    try:
-        interpretation_result = interpreter.interpret_prescription(image)
-        print("Prescription interpreted")
-        
-        # Fetch user's inventory
-        connection = create_connection()
-        if connection is None:
-            print("Database connection failed")
-            return jsonify({'error': 'Database connection failed'}), 500
+        return jsonify({'error': str(e)}), e.status
 
+    if run_async:
         try:
-            cursor = connection.cursor(dictionary=True)
-            query = "SELECT name, quantity, expiryDate FROM medicines WHERE userId = %s"
-            cursor.execute(query, (user_id,))
-            inventory_medicines = cursor.fetchall()
-            print(f"Fetched {len(inventory_medicines)} medicines from inventory")
-        except Error as e:
-            print(f"Database error: {str(e)}")
-            return jsonify({'error': f'Failed to fetch inventory: {str(e)}'}), 500
-        finally:
-            if connection.is_connected():
-                cursor.close()
-                connection.close()
-
-        # Compare prescribed medicines with inventory
-        inventory_text = "\n".join([f"{med['name']} (Quantity: {med['quantity']}, Expires: {med['expiryDate']})" for med in inventory_medicines])
-        comparison_result = interpreter.compare_medicines(interpretation_result, inventory_text)
-        print("Medicines compared with inventory")
-
+            job = interpret_queue.submit(interpret_job, user_id, mode, image, upload, with_job=True)
+        except QueueFullError:
+            return jsonify({'error': 'Too many prescriptions are being interpreted. Please try again shortly.'}), 503, {'Retry-After': '10'}
+        status_url = f"/interpret/jobs/{job.id}"
         return jsonify({
-            'prescription_interpretation': interpretation_result,
-            'inventory_comparison': comparison_result
-        }), 200
-    except Exception as e:
-        print(f"Error during interpretation: {str(e)}")
-        return jsonify({'error': f'Error during interpretation: {str(e)}'}), 500
+            'jobId': job.id,
+            'status': job.status,
+            'statusUrl': status_url,
+            'eventsUrl': f"{status_url}/events"
+        }), 202, {'Location': status_url}
+
+    body, status, timings = run_interpretation(user_id, mode, image, upload)
+    response = jsonify(body)
+    response.headers['Server-Timing'] = server_timing(timings)
+    return response, status
+
+@app.route('/interpret/jobs/<job_id>', methods=['GET'])
+def get_interpret_job(job_id):
+    job = interpret_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return jsonify(dict(job.to_dict(), events=[event for event, _ in job.events])), 200
+
+@app.route('/interpret/jobs/<job_id>/events', methods=['GET'])
+def stream_interpret_job(job_id):
+    # Replays the job's stage events, then streams the rest as they happen and
+    # ends with "done" (the job, with its result) or "error"
+    job = interpret_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+
+    def generate():
+        seen = 0
+        while True:
+            events = job.wait(seen, timeout=15)
+            for event, data in events:
+                yield sse_event(data, event)
+            seen += len(events)
+            if job.finished_at is not None and seen == len(job.events):
+                break
+            if not events:
+                # Comment line that keeps proxies from closing an idle stream
+                yield ': keep-alive\n\n'
+        if job.status == 'done':
+            yield sse_event(job.to_dict(), 'done')
+        else:
+            yield sse_event({'jobId': job.id, 'error': job.error}, 'error')
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Pages or images one /interpret/batch request may carry
+BATCH_MAX_PAGES = int(os.getenv('INTERPRET_BATCH_MAX_PAGES', '20'))
+INTERPRET_BATCH_DEADLINE = float(os.getenv('INTERPRET_BATCH_DEADLINE', '300'))
+# Pages being read by the model at once, across all batch requests of a worker
+BATCH_CONCURRENCY = int(os.getenv('INTERPRET_BATCH_CONCURRENCY', '4'))
+batch_page_executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='batch-page')
+
+def read_page(image, upload=None):
+    # Returns (prescription or None, ms)
+    started = time.monotonic()
+    prescription = interpreter.extract_structured(prepare_image(image, 'prescription', original=upload))
+    return prescription, round((time.monotonic() - started) * 1000, 1)
+
+def read_pages(pages):
+    # pages yields (image, upload), decoding or rendering each page when it is
+    # asked for the next one. A page is queued as soon as it is decoded, so
+    # later pages decode while earlier ones are read, but no more than
+    # BATCH_CONCURRENCY decoded pages of a request are held at once.
+    futures = []
+    for image, upload in pages:
+        futures.append(batch_page_executor.submit(read_page, image, upload))
+        pending = [future for future in futures if not future.done()]
+        if len(pending) >= BATCH_CONCURRENCY:
+            wait(pending, return_when=FIRST_COMPLETED)
+    return [future.result() for future in futures]
+
+def merge_pages(pages):
+    prescriptions = [prescription for prescription, _ in pages if prescription]
+    return interpreter.structured_result(interpreter.merge_prescriptions(prescriptions) if prescriptions else None)
+
+@app.route('/interpret/batch', methods=['POST'])
+def interpret_batch():
+    # Several photos ('images') or a PDF ('pdf') of one prescription. Each page
+    # is read separately; the banned-drug check and inventory comparison run
+    # once on the merged medications.
+    user_id = request.form.get('userId')
+    image_files = request.files.getlist('images')
+    pdf_file = request.files.get('pdf')
+
+    if not user_id:
+        return jsonify({'error': 'User ID is required'}), 400
+    if bool(image_files) == (pdf_file is not None):
+        return jsonify({'error': "Provide either 'images' or a 'pdf'"}), 400
+
+    document = None
+    try:
+        if pdf_file is not None:
+            try:
+                document = PdfPages(pdf_file.read())
+            except Exception as e:
+                raise UploadError("Unable to open PDF file") from e
+            if len(document) > BATCH_MAX_PAGES:
+                document.close()
+                raise UploadError(f"PDF has more than {BATCH_MAX_PAGES} pages", 413)
+            profile = IMAGE_PROFILES['prescription']
+            pages = ((image, None) for image in document.render(profile['max_dimension'], profile['grayscale']))
+        else:
+            if len(image_files) > BATCH_MAX_PAGES:
+                raise UploadError(f"More than {BATCH_MAX_PAGES} images", 413)
+            uploads = [ImageUpload(image_file) for image_file in image_files]
+            # Decoded one at a time as the pages stage gets to them
+            pages = ((open_upload(upload, 'prescription'), upload) for upload in uploads)
+    except UploadError as e:
+        print(f"Error opening batch: {e}")
+        return jsonify({'error': str(e)}), e.status
+
+    pipeline = (Pipeline(deadline=INTERPRET_BATCH_DEADLINE)
+                .add('inventory', lambda _: fetch_inventory(user_id))
+                .add('pages', lambda _: read_pages(pages))
+                .add('interpret', lambda r: merge_pages(r['pages']), deps=['pages'])
+                .add('compare', lambda r: compare_with_inventory(r['interpret'], r['inventory']),
+                     deps=['interpret', 'inventory']))
+
+    try:
+        results, timings = pipeline.run()
+    except PipelineTimeout as e:
+        print(f"Batch interpretation timed out: {e}")
+        response = jsonify({'error': 'Prescription interpretation timed out. Please try again.'})
+        response.headers['Server-Timing'] = server_timing(e.timings)
+        return response, 504
+    except StageError as e:
+        print(f"Error during batch interpretation: {e}")
+        if isinstance(e.error, UploadError):
+            return jsonify({'error': str(e.error)}), e.error.status
+        if e.stage == 'inventory':
+            return jsonify({'error': f'Failed to fetch inventory: {str(e.error)}'}), 500
+        return jsonify({'error': f'Error during interpretation: {str(e.error)}'}), 500
+    finally:
+        # render() only closes the document once every page was rendered
+        if document is not None:
+            document.close()
+
+    comparison, matches = results['compare']
+    body = {
+        'prescription_interpretation': results['interpret'],
+        'inventory_comparison': comparison,
+        'pages': [{'page': number, 'read': prescription is not None,
+                   'medications': len(prescription.get('medications') or []) if prescription else 0}
+                  for number, (prescription, _) in enumerate(results['pages'], 1)]
+    }
+    if matches is not None:
+        body['inventory_matches'] = matches
+    response = jsonify(body)
+    timings.update((f"page_{number}", duration) for number, (_, duration) in enumerate(results['pages'], 1))
+    response.headers['Server-Timing'] = server_timing(timings)
+    return response, 200
 
 
 class MedicineInfoScraper:
-    def __init__(self, api_key):
+    def __init__(self, llm, knowledge_cache=None):
+        # Scraped text, RxNav classes and summaries are shared across users
+        self.knowledge_cache = knowledge_cache or MedicineKnowledgeCache()
         self.session = requests.Session()
         retry_strategy = Retry(
             total=3,
@@ -603,35 +935,46 @@ class MedicineInfoScraper:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
         
-        # Initialize Gemini model
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name="gemini-1.5-pro")
+        self.model = llm.model('default')
+
+        # Source lookups (drugs.com, RxNav) and the page fetches inside them run
+        # on separate pools so a lookup never waits on a slot its own pages need
+        self.lookup_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='medicine-lookup')
+        self.fetch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='medicine-fetch')
+        # Overall time budget for the source lookups of one description
+        self.lookup_deadline = float(os.getenv('MEDICINE_LOOKUP_DEADLINE', '20'))
+
+    def _fetch_page_text(self, url, class_name):
+        response = self.session.get(url, timeout=10)
+        soup = BeautifulSoup(response.text, 'html.parser')
+        content = soup.find('div', class_=class_name)
+        if content:
+            # Extract all text from the content div
+            return content.get_text(strip=True, separator=' ')
+        return None
 
     def _scrape_drugs_com(self, medicine_name):
+        # Request the monograph page and the search page together; search
+        # results are only used when the monograph page has no content
+        page_url = f"https://www.drugs.com/{quote(medicine_name.lower())}.html"
+        search_url = f"https://www.drugs.com/search.php?searchterm={quote(medicine_name)}"
+        page = self.fetch_executor.submit(self._fetch_page_text, page_url, 'contentBox')
+        search = self.fetch_executor.submit(self._fetch_page_text, search_url, 'ddc-media-list')
+
         try:
-            search_url = f"https://www.drugs.com/{quote(medicine_name.lower())}.html"
-            response = self.session.get(search_url, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            content = soup.find('div', class_='contentBox')
-            if content:
-                # Extract all text from the content div
-                full_text = content.get_text(strip=True, separator=' ')
+            full_text = page.result()
+            if full_text:
+                search.cancel()
                 return full_text
-            
-            # If direct URL fails, try the search page
-            search_url = f"https://www.drugs.com/search.php?searchterm={quote(medicine_name)}"
-            response = self.session.get(search_url, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            result = soup.find('div', class_='ddc-media-list')
-            if result:
-                full_text = result.get_text(strip=True, separator=' ')
-                return full_text
-            
-            return None
         except Exception as e:
             print(f"Error scraping drugs.com: {e}")
+            search.cancel()
+            return None
+
+        try:
+            return search.result()
+        except Exception as e:
+            print(f"Error scraping drugs.com search: {e}")
             return None
 
     def _query_rxnav_api(self, medicine_name):
@@ -683,37 +1026,52 @@ class MedicineInfoScraper:
         """
 
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            return self.model.generate_text(prompt, cache_site='medicine_summary')
         except Exception as e:
             print(f"Error summarizing with Gemini: {e}")
             return None
 
-    def get_medicine_description(self, medicine_name):
+    def get_medicine_description(self, medicine_name, force_refresh=False):
+        cache = self.knowledge_cache
+        if not force_refresh:
+            found, summary = cache.get('summary', medicine_name)
+            if found and summary:
+                return summary
+
+        # Query every source at once and summarize whatever arrived by the
+        # deadline. A slow lookup keeps running and still fills the cache.
+        lookups = [
+            self.lookup_executor.submit(cache.get_or_load, 'drugs_com', medicine_name,
+                                        self._scrape_drugs_com, force_refresh),
+            self.lookup_executor.submit(cache.get_or_load, 'rxnav', medicine_name,
+                                        self._query_rxnav_api, force_refresh),
+        ]
+        done, pending = wait(lookups, timeout=self.lookup_deadline)
+        if pending:
+            print(f"{len(pending)} source lookup(s) for {medicine_name} missed the {self.lookup_deadline}s deadline")
+
         description_parts = []
-        
-        drugs_com_desc = self._scrape_drugs_com(medicine_name)
-        if drugs_com_desc:
-            description_parts.append(drugs_com_desc)
-            
-        rxnav_desc = self._query_rxnav_api(medicine_name)
-        if rxnav_desc:
-            description_parts.append(rxnav_desc)
+        for lookup in lookups:
+            if lookup in done and lookup.exception() is None and lookup.result():
+                description_parts.append(lookup.result())
             
         if description_parts:
             combined_desc = ' '.join(description_parts)
             summarized_desc = self.summarize_with_gemini(combined_desc)
-            return summarized_desc if summarized_desc else combined_desc
+            if summarized_desc:
+                # A summary built from partial sources is not worth keeping
+                if not pending:
+                    cache.put('summary', medicine_name, summarized_desc)
+                return summarized_desc
+            return combined_desc
         
         return f"{medicine_name} - Please consult a healthcare professional for detailed information about this medication."
     
 
 @app.route('/api/chat', methods=['POST'])
 def chat_with_therapist():
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(model_name="gemini-1.5-pro")
-    chat = model.start_chat(history=[])
     user_input = request.json.get('message')
+    session, created = chat_sessions.get_or_create(request.json.get('session_id'))
     
     prompt = f"""
     You are an AI-based mental health therapist. Your role is to provide supportive, empathetic responses to users seeking help with mental health issues. Always maintain a professional and caring tone. If a user expresses thoughts of self-harm or suicide, advise them to seek immediate professional help and provide resources like suicide prevention hotlines. Remember that you're not a replacement for a human therapist, but a supportive tool to help users explore their thoughts and feelings.
@@ -723,14 +1081,56 @@ def chat_with_therapist():
     """
 
     try:
-        response = chat.send_message(prompt)
-        return jsonify({"response": response.text})
+        with session.lock:
+            chat = llm.model('default').start_chat(history=session.contents())
+            response = chat.send_message(prompt)
+            session.add_turn('user', user_input)
+            session.add_turn('bot', response.text)
+            mental_health.memory.compact(session)
+        chat_sessions.touch(session)
+        return jsonify({"response": response.text, "session_id": session.id, "new_session": created})
     except Exception as e:
         print(f"Error generating response: {e}")
         return jsonify({"error": "Failed to generate response"}), 500
 
 # Update the global instance of the scraper
-medicine_scraper = MedicineInfoScraper(api_key)
+medicine_knowledge = MedicineKnowledgeCache(db_pool)
+medicine_scraper = MedicineInfoScraper(llm, medicine_knowledge)
+
+# Description enrichment runs off the request path on a bounded worker pool
+enrichment_queue = JobQueue(
+    'enrichment',
+    max_workers=int(os.getenv('ENRICHMENT_WORKERS', '4')),
+    max_pending=int(os.getenv('ENRICHMENT_QUEUE_SIZE', '100'))
+)
+
+def store_description(medicine_id, description, status):
+    connection = create_connection()
+    if connection is None:
+        raise Error(msg='Database connection failed')
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        # Keep the previous description if a refresh fails
+        cursor.execute(
+            "UPDATE medicines SET description = COALESCE(%s, description), description_status = %s WHERE id = %s",
+            (description, status, medicine_id)
+        )
+        connection.commit()
+    finally:
+        if cursor is not None:
+            cursor.close()
+        connection.close()
+
+def enrich_medicine(medicine_id, medicine_name, force_refresh=False):
+    try:
+        description = medicine_scraper.get_medicine_description(medicine_name, force_refresh)
+        status = 'ready'
+    except Exception as e:
+        print(f"Error enriching medicine {medicine_id}: {e}")
+        description, status = None, 'failed'
+    store_description(medicine_id, description, status)
+    return description
 
 # Modify your add_medicine route to use the new scraper
 @app.route('/medicines', methods=['POST'])
@@ -746,27 +1146,35 @@ def add_medicine():
         return jsonify({'error': 'Database connection failed'}), 500
 
     try:
-        # Use the new scraper to get medicine description
-        description = medicine_scraper.get_medicine_description(data['name'])
-
         cursor = connection.cursor()
         query = """
-        INSERT INTO medicines (name, quantity, expiryDate, userId, userEmail, username, description)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        INSERT INTO medicines (name, quantity, expiryDate, userId, userEmail, username, description_status)
+        VALUES (%s, %s, %s, %s, %s, %s, 'pending')
         """
         values = (data['name'], data['quantity'], data['expiryDate'],
-                 data['userId'], data['userEmail'], data['username'], description)
+                 data['userId'], data['userEmail'], data['username'])
         cursor.execute(query, values)
         connection.commit()
+        medicine_id = cursor.lastrowid
+
+        try:
+            enrichment_queue.submit(enrich_medicine, medicine_id, data['name'], key=medicine_id)
+            description_status = 'pending'
+        except QueueFullError as e:
+            print(f"Skipping description for medicine {medicine_id}: {e}")
+            cursor.execute("UPDATE medicines SET description_status = 'failed' WHERE id = %s", (medicine_id,))
+            connection.commit()
+            description_status = 'failed'
+
         return jsonify({
             'message': 'Medicine added successfully',
-            'id': cursor.lastrowid,
-            'description': description
+            'id': medicine_id,
+            'description': None,
+            'description_status': description_status
         }), 201
     except Error as e:
         return jsonify({'error': f'Failed to add medicine: {str(e)}'}), 500
     finally:
-        print(description)
         if connection.is_connected():
             cursor.close()
             connection.close()
@@ -782,18 +1190,35 @@ def refresh_medicine_description(medicine_id):
         cursor = connection.cursor(dictionary=True)
         
         # Get the medicine name
-        cursor.execute("SELECT name FROM medicines WHERE id = %s", (medicine_id,))
+        cursor.execute("SELECT name, description_status FROM medicines WHERE id = %s", (medicine_id,))
         medicine = cursor.fetchone()
         
         if not medicine:
             return jsonify({'error': 'Medicine not found'}), 404
+
+        # ?async=1 queues the refresh on the enrichment pool instead of waiting for it
+        if request.args.get('async', '').lower() in ('1', 'true'):
+            # Mark the row first so a fast job can't be overwritten by this update
+            cursor.execute("UPDATE medicines SET description_status = 'pending' WHERE id = %s", (medicine_id,))
+            connection.commit()
+            try:
+                enrichment_queue.submit(enrich_medicine, medicine_id, medicine['name'], True, key=medicine_id)
+            except QueueFullError:
+                cursor.execute("UPDATE medicines SET description_status = %s WHERE id = %s",
+                               (medicine['description_status'], medicine_id))
+                connection.commit()
+                return jsonify({'error': 'Too many descriptions are being refreshed, please try again later'}), 503
+            return jsonify({
+                'message': 'Description refresh queued',
+                'description_status': 'pending'
+            }), 202
         
-        # Get new description
-        new_description = medicine_scraper.get_medicine_description(medicine['name'])
+        # Get new description, bypassing the shared knowledge cache
+        new_description = medicine_scraper.get_medicine_description(medicine['name'], force_refresh=True)
         
         # Update the description
         cursor.execute(
-            "UPDATE medicines SET description = %s WHERE id = %s",
+            "UPDATE medicines SET description = %s, description_status = 'ready' WHERE id = %s",
             (new_description, medicine_id)
         )
         connection.commit()
@@ -808,6 +1233,100 @@ def refresh_medicine_description(medicine_id):
         if connection.is_connected():
             cursor.close()
             connection.close()
+@app.route('/medicines/<int:medicine_id>/description', methods=['GET'])
+def get_medicine_description_status(medicine_id):
+    connection = create_connection()
+    if connection is None:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT id, description_status, description FROM medicines WHERE id = %s", (medicine_id,))
+        medicine = cursor.fetchone()
+        if not medicine:
+            return jsonify({'error': 'Medicine not found'}), 404
+        return jsonify(medicine), 200
+    except Error as e:
+        return jsonify({'error': f'Failed to fetch description: {str(e)}'}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+# Columns a client may request through ?fields=
+MEDICINE_FIELDS = ('id', 'name', 'quantity', 'expiryDate', 'userId', 'userEmail',
+                   'username', 'created_at', 'updated_at', 'description_status', 'description')
+# The generated description is by far the largest column, so it is opt-in
+DEFAULT_MEDICINE_FIELDS = tuple(field for field in MEDICINE_FIELDS if field != 'description')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+MEDICINES_PAGE_QUERY = """
+SELECT {columns} FROM medicines
+WHERE userId = %s AND id > %s
+ORDER BY id
+LIMIT %s
+"""
+
+GROUP_INVENTORY_PAGE_QUERY = """
+SELECT {columns} FROM medicines m
+JOIN group_members gm ON m.userId = gm.user_id
+WHERE gm.group_id = %s AND m.id > %s
+ORDER BY m.id
+LIMIT %s
+"""
+
+def encode_cursor(last_id):
+    payload = json.dumps({'id': last_id}).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))['id']
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(last_id, int):
+        raise ValueError('Invalid cursor')
+    return last_id
+
+# Parse ?fields=, ?limit= and ?cursor= shared by the inventory listings
+def parse_page_args(args):
+    fields = DEFAULT_MEDICINE_FIELDS
+    if args.get('fields'):
+        fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in MEDICINE_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        # id drives the cursor, so it is always returned
+        fields = ['id'] + [field for field in fields if field != 'id']
+
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+
+    after_id = decode_cursor(args['cursor']) if args.get('cursor') else 0
+    return fields, limit, after_id
+
+# Fetch one keyset page; one extra row tells us whether another page exists
+def fetch_page(cursor, query, columns, key, limit, after_id):
+    cursor.execute(query.format(columns=columns), (key, after_id, limit + 1))
+    rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['id'])
+    return rows, next_cursor
+
+def page_response(rows, next_cursor):
+    response = jsonify(rows)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
 @app.route('/medicines', methods=['GET'])
 def get_medicines():
     user_id = request.args.get('userId')
@@ -816,16 +1335,20 @@ def get_medicines():
     if not user_id:
         return jsonify({'error': 'User ID is required'}), 400
 
+    try:
+        fields, limit, after_id = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     connection = create_connection()
     if connection is None:
         return jsonify({'error': 'Database connection failed'}), 500
 
     try:
         cursor = connection.cursor(dictionary=True)
-        query = "SELECT * FROM medicines WHERE userId = %s"
-        cursor.execute(query, (user_id,))
-        medicines = cursor.fetchall()
-        return jsonify(medicines), 200
+        medicines, next_cursor = fetch_page(cursor, MEDICINES_PAGE_QUERY, ', '.join(fields),
+                                            user_id, limit, after_id)
+        return page_response(medicines, next_cursor), 200
     except Error as e:
         return jsonify({'error': f'Failed to fetch medicines: {str(e)}'}), 500
     finally:
@@ -882,8 +1405,7 @@ def delete_medicine(medicine_id):
 
 @app.route('/search-medicines', methods=['GET'])
 def search_medicines():
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-pro')
+    model = llm.model('default')
     user_id = request.args.get('userId')
     query = request.args.get('query')
 
@@ -909,12 +1431,12 @@ def search_medicines():
         while description_keywords should be symptoms or conditions.
         """
         
-        response = model.generate_content(prompt)
-        print(f"Raw Gemini response: {response.text}")  # Debug print
+        response_text = model.generate_text(prompt, cache_site='search_keywords')
+        print(f"Raw Gemini response: {response_text}")  # Debug print
         
         try:
             # Remove Markdown code block syntax if present
-            json_str = response.text.strip('`').strip()
+            json_str = response_text.strip('`').strip()
             if json_str.startswith('json'):
                 json_str = json_str[4:].strip()
             interpretation = json.loads(json_str)
@@ -1003,7 +1525,41 @@ def get_expired_medicines():
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy'}), 200
+    return jsonify({'status': 'healthy', 'banned_drugs': banned_list.info()}), 200
+
+# Admin endpoints are off unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+admin_queue = JobQueue('admin', max_workers=1, max_pending=4)
+
+def is_admin_request():
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+@app.route('/admin/banned-drugs/reload', methods=['POST'])
+def reload_banned_drugs():
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    # Rebuilding can take seconds; requests keep using the current list meanwhile
+    try:
+        job = admin_queue.submit(banned_list.reload, key='banned-drugs-reload')
+    except QueueFullError:
+        return jsonify({'error': 'A reload is already queued'}), 503
+    return jsonify({'job': job.to_dict(), 'banned_drugs': banned_list.info()}), 202
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({
+        'db_pool': db_pool.stats(),
+        'enrichment_queue': enrichment_queue.stats(),
+        'medicine_knowledge': medicine_knowledge.stats(),
+        'llm': llm.stats(),
+        'llm_cache': llm.cache.stats(),
+        'interpret_queue': interpret_queue.stats(),
+        'image_results': image_results.stats(),
+        'request_memory': request_memory.stats(),
+        'chat_sessions': chat_sessions.stats(),
+        'chat_memory': mental_health.memory.stats()
+    }), 200
         
 
 @app.route('/chat', methods=['POST'])
@@ -1032,12 +1588,67 @@ def mentalchat():
         return jsonify({'error': 'User input is required'}), 400
 
     try:
-        response = mental_health.get_mentalhealth_advice(user_input, conversation_history)
-        return jsonify({"response": response}), 200
+        if conversation_history:
+            # Older clients still send the whole transcript on every turn
+            response = mental_health.get_mentalhealth_advice(user_input, conversation_history)
+            return jsonify({"response": response}), 200
+
+        session, created = chat_sessions.get_or_create(data.get('session_id'))
+        response = mental_health.chat(session, user_input)
+        chat_sessions.touch(session)
+        return jsonify({"response": response, "session_id": session.id, "new_session": created}), 200
     except Exception as e:
         print(f"Error in chat endpoint: {e}")
         return jsonify({"error": "Failed to generate response"}), 500
 
+# Relay text chunks as server-sent events: an optional "start" event carries
+# metadata, "chunk" events carry {"text": ...} to append, then a final "done"
+# (or "error") event closes the stream
+def sse_response(chunks, start=None):
+    def generate():
+        try:
+            if start is not None:
+                yield sse_event(start, 'start')
+            for text in chunks:
+                yield sse_event({'text': text}, 'chunk')
+            yield sse_event({}, 'done')
+        except Exception as e:
+            print(f"Error while streaming response: {e}")
+            yield sse_event({'error': 'Failed to generate response'}, 'error')
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    data = request.json
+    user_input = data.get('message', '')
+
+    if not user_input:
+        return jsonify({'error': 'User input is required'}), 400
+
+    return sse_response(health_advisor.stream_health_advice(user_input))
+
+@app.route('/mental_chat/stream', methods=['POST'])
+def mentalchat_stream():
+    data = request.json
+    user_input = data.get('message', '')
+    conversation_history = data.get('conversation_history', '')
+
+    if not user_input:
+        return jsonify({'error': 'User input is required'}), 400
+
+    if conversation_history:
+        return sse_response(mental_health.stream_mentalhealth_advice(user_input, conversation_history))
+
+    session, created = chat_sessions.get_or_create(data.get('session_id'))
+
+    def session_chunks():
+        yield from mental_health.stream_chat(session, user_input)
+        chat_sessions.touch(session)
+
+    return sse_response(session_chunks(), start={'session_id': session.id, 'new_session': created})
+
     
 
 # New endpoints for family group functionality
@@ -1107,20 +1718,21 @@ def get_group_inventory():
     if not group_id:
         return jsonify({'error': 'Group ID is required'}), 400
 
+    try:
+        fields, limit, after_id = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     connection = create_connection()
     if connection is None:
         return jsonify({'error': 'Database connection failed'}), 500
 
     try:
         cursor = connection.cursor(dictionary=True)
-        query = """
-        SELECT m.* FROM medicines m
-        JOIN group_members gm ON m.userId = gm.user_id
-        WHERE gm.group_id = %s
-        """
-        cursor.execute(query, (group_id,))
-        medicines = cursor.fetchall()
-        return jsonify(medicines), 200
+        columns = ', '.join(f'm.{field}' for field in fields)
+        medicines, next_cursor = fetch_page(cursor, GROUP_INVENTORY_PAGE_QUERY, columns,
+                                            group_id, limit, after_id)
+        return page_response(medicines, next_cursor), 200
     except Error as e:
         return jsonify({'error': f'Failed to fetch group inventory: {str(e)}'}), 500
     finally:
@@ -1361,9 +1973,8 @@ def process_intent():
     """.format(input=user_input)
 
     try:
-        model = genai.GenerativeModel('gemini-1.5-pro')
-        response = model.generate_content(prompt)
-        intent = response.text.strip().lower()
+        response_text = llm.model('default').generate_text(prompt, cache_site='intent')
+        intent = response_text.strip().lower()
         
         # Validate intent is one of the allowed values
         valid_intents = ['inventory', 'prescription', 'family-group', 'therapist', 'diagnosis']
@@ -0,0 +1,575 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+from rapidfuzz import fuzz
+
+from inventory_match import DOSE_FORMS, SALTS, STRENGTH
+from pdf_ingest import PDF_BACKEND, PDF_WORKERS, iter_page_texts
+
+PDF_PATH = os.getenv('BANNED_DRUGS_PDF', 'banned_drugs.pdf')
+# Parsed entries, reused while the PDF's content hash is unchanged
+CACHE_PATH = os.getenv('BANNED_DRUGS_CACHE', 'banned_drugs.cache.json')
+# Bump whenever parse_banned_list() output changes so old caches are re-parsed
+CACHE_FORMAT = 5
+# fuzz.ratio score (0-100) OCR text needs to count as a banned name it doesn't
+# spell exactly; 100 turns fuzzy matching off
+FUZZY_THRESHOLD = float(os.getenv('BANNED_DRUGS_FUZZY_THRESHOLD', '85'))
+# Shorter words are too ambiguous to match fuzzily
+FUZZY_MIN_LENGTH = 5
+WORD = re.compile(r"[^\W\d_][^\W_'’-]*(?:['’-][^\W_'’-]+)*")
+# Seconds between checks of the PDF for changes; 0 turns the watcher off
+WATCH_INTERVAL = float(os.getenv('BANNED_DRUGS_WATCH_INTERVAL', '60'))
+# A reloaded list with fewer entries than this share of the active one is
+# refused, e.g. when the text backend lost most of the PDF's layout
+MIN_ENTRY_RATIO = float(os.getenv('BANNED_DRUGS_MIN_ENTRY_RATIO', '0.5'))
+# Fewest entries a parsed list may have; banned_drugs.pdf has over 400, and a
+# backend that mangles its layout finds a handful
+MIN_ENTRIES = int(os.getenv('BANNED_DRUGS_MIN_ENTRIES', '100'))
+# Backend the first load falls back to when the configured one finds too few
+FALLBACK_BACKEND = 'pypdf2'
+
+# banned_drugs.pdf is a numbered list: "12.  <drug or combination>.  GSR NO. ..."
+ENTRY = re.compile(r'(?m)^\s*(\d{1,3})\.\s+')
+# Where the notification column starts
+NOTIFICATION = re.compile(r'\s(?:(?:Substituted|GSR|Initial|vide)\b|G\.\s*S\.\s*R|S\.\s*O\.)')
+# Entries that name a class of combinations or products rather than one substance
+NON_SUBSTANCE = re.compile(r'^(?:Fixed|Combination|Combikit|Preparations|Liquid|Antidiarrhoeal|Patent|Parenteal|'
+                           r'The |All |Cosmetics|Serodiagnostic)', re.IGNORECASE)
+NAME = re.compile(r"^[A-Z][A-Za-z’'\-]*(?:\s+(?!Liquid\b|Oral\b|Tablets?\b|Ointment\b|I\.)[A-Z][A-Za-z’'\-]*)*")
+FDC_PREFIX = re.compile(r'^(?:Fixed\s+dose\s+combinations?\s+(?:of|containing)|Combikit\s+of)\s+', re.IGNORECASE)
+# Words around ingredient names in combination entries that aren't part of them
+FORM_WORDS = DOSE_FORMS | {
+    'injection', 'injectable', 'oral', 'suspension', 'solution', 'dispersible', 'dispesible', 'lozenges',
+    'liquid', 'granules', 'infusion', 'expectorant', 'linctus', 'paediatric', 'pediatric', 'sachet',
+    'ip', 'bp', 'usp', 'for', 'human', 'use',
+}
+# Form and release words that limit a combination's ban to some products, e.g.
+# "Nimesulide + Paracetamol injection" or "Aceclofenac (SR) + Paracetamol"
+FORM_QUALIFIERS = FORM_WORDS - {'ip', 'bp', 'usp', 'for', 'human', 'use', 'liquid', 'gel'}
+# Combination entries worded like this ban a class of drugs, not named ingredients
+CLASS_WORDS = re.compile(r'\b(?:any|other|or|in|containing|including|drugs?|group|agents?|preparations?|than)\b|/',
+                         re.IGNORECASE)
+
+
+def _spaced(phrase):
+    # Text extraction breaks some words apart ("it s formulations", "a nd its
+    # formulations"), so a letter of each word may be followed by a space
+    return r'\s+'.join(r'\s?'.join(map(re.escape, word)) for word in phrase.split())
+
+
+# Wording that restates the ban without narrowing it
+UNCONDITIONAL = re.compile('|'.join([
+    rf"(?:{_spaced('and its formulations')}|{_spaced('and all formulations')})(?:\s+{_spaced('containing')}\s+\w+)?",
+    rf"{_spaced('and formulations containing')}\s+\w+",
+    _spaced('for human use'),
+    rf",?\s*{_spaced('its salts')}",
+    _spaced('as a drug'),
+    r'I\.\s*P\.',
+    r'[.\s]',
+]), re.IGNORECASE)
+# A letter broken off the end of a word ("phenytoi n"); vitamin letters and
+# the l-, d- and n- of chemical names stand on their own
+SPLIT_FRAGMENT = re.compile(r'\b(?!vitamin\b)[a-z]{3,} (?![dln] [a-z])[a-z]\b(?! \d)')
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_cache(cache_path, digest, backend):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            cached = json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Error reading banned drugs cache: {e}")
+        return None
+    # Backends lay text out differently, so their entries aren't interchangeable
+    if (cached.get('format') != CACHE_FORMAT or cached.get('pdf_sha256') != digest
+            or cached.get('backend') != backend):
+        return None
+    return cached['entries']
+
+
+def _write_cache(cache_path, digest, backend, entries):
+    # Written to a temporary file and renamed, so workers starting at the same
+    # time never read a partial cache
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump({'format': CACHE_FORMAT, 'pdf_sha256': digest, 'backend': backend, 'entries': entries},
+                      file, separators=(',', ':'))
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"Error writing banned drugs cache: {e}")
+
+
+def load_banned_entries(pdf_path=PDF_PATH, cache_path=CACHE_PATH, backend=PDF_BACKEND, workers=PDF_WORKERS):
+    # Returns (entries, PDF sha256). The PDF is only parsed when the cache is
+    # missing or was built from a different PDF, backend or parser version.
+    digest = file_digest(pdf_path)
+    entries = _read_cache(cache_path, digest, backend) if cache_path else None
+    if entries is None:
+        entries = rejoin_split_words(list(iter_banned_entries(iter_page_texts(pdf_path, backend, workers))))
+        suspect = split_ingredients(entries)
+        if suspect:
+            print(f"Warning: {len(suspect)} banned drug ingredient names look split by PDF extraction: "
+                  + ', '.join(suspect))
+        if cache_path:
+            _write_cache(cache_path, digest, backend, entries)
+    return entries, digest
+
+
+def parse_banned_list(text):
+    return rejoin_split_words(list(iter_banned_entries([text])))
+
+
+def rejoin_split_words(entries):
+    # PDF extraction breaks some words apart ("p henylephrine", "famotidin e").
+    # Two neighbouring words of an ingredient are joined back when the joined
+    # word occurs in the list at least as often as either part does, so
+    # "ranitid ine" becomes "ranitidine" while "sodium citrate" stays apart.
+    # Single letters don't count as parts: split words leave plenty of them.
+    counts = Counter(word for entry in entries for word in re.findall(r'[a-z]+', entry['text'].lower()))
+    for entry in entries:
+        if entry.get('ingredients'):
+            ingredients = {_rejoin(ingredient, counts) for ingredient in entry['ingredients']}
+            entry['ingredients'] = sorted(ingredients) if len(ingredients) > 1 else None
+    return entries
+
+
+def _rejoin(ingredient, counts):
+    words = []
+    for word in ingredient.split():
+        if words and words[-1].isalpha() and word.isalpha():
+            joined = words[-1] + word
+            if counts[joined] and all(counts[joined] >= counts[part] for part in (words[-1], word) if len(part) > 1):
+                words[-1] = joined
+                continue
+        words.append(word)
+    return ' '.join(words)
+
+
+def split_ingredients(entries):
+    # Sanity check on parsed names: ingredients that still look broken apart
+    return sorted({ingredient for entry in entries for ingredient in entry.get('ingredients') or ()
+                   if SPLIT_FRAGMENT.search(ingredient)})
+
+
+def iter_banned_entries(pages):
+    # Split the PDF text into its numbered entries, yielding each one as soon
+    # as the next entry starts; only the text of the unfinished entry is kept.
+    # Each entry is a dict with its number, its text without the notification
+    # column, and its kind: 'substance' (with the drug name and whether the ban
+    # is conditional, e.g. only for children or one formulation),
+    # 'combination', or 'other'.
+    last_number = 0
+    # Text of the unfinished entry from its number on, and where its text starts
+    pending = ''
+    body = 0
+    for page in pages:
+        # Entries continue across page breaks
+        pending = f"{pending}\n{page}" if pending else page
+        cut = None
+        for match in ENTRY.finditer(pending, body):
+            # Numbers inside an entry (sub-lists, dates) don't continue the sequence
+            if int(match.group(1)) != last_number + 1:
+                continue
+            if last_number:
+                yield _parse_entry(last_number, pending[body:match.start()])
+            last_number = int(match.group(1))
+            cut = match.start()
+            body = match.end()
+        if cut is not None:
+            pending = pending[cut:]
+            body -= cut
+        elif not last_number:
+            # Nothing before the first entry is needed
+            pending = ''
+    if last_number:
+        yield _parse_entry(last_number, pending[body:])
+
+
+def _parse_entry(number, raw):
+    notification = NOTIFICATION.search(raw)
+    body = raw[:notification.start()] if notification else raw
+    body = ' '.join(body.replace('*', '').replace('“', '').replace('”', '').split())
+    entry = {'number': number, 'text': body.rstrip(' .')}
+
+    if '+' in body or re.search(r'combination|combikit', body, re.IGNORECASE):
+        entry['kind'] = 'combination'
+        entry['ingredients'] = parse_ingredients(body)
+        # Ingredients are indexed without their forms, so the ban is only
+        # certain for entries that don't name one
+        entry['forms'] = sorted({word for word in re.findall(r'[a-z]+', body.lower()) if word in FORM_QUALIFIERS})
+        entry['conditional'] = bool(entry['forms'])
+        return entry
+    name = NAME.match(body)
+    if NON_SUBSTANCE.match(body) or not name:
+        entry['kind'] = 'other'
+        return entry
+    entry['kind'] = 'substance'
+    entry['name'] = name.group(0)
+    entry['conditional'] = bool(UNCONDITIONAL.sub('', body[name.end():]))
+    return entry
+
+
+def parse_ingredients(text):
+    # Sorted normalized ingredients of a combination entry that names them
+    # ("A + B + C", "Combikit of A, B and C"), or None for entries that
+    # describe a class ("Vitamins with Analgesics")
+    text = re.split(r'\s+except\b', FDC_PREFIX.sub('', text), flags=re.IGNORECASE)[0]
+    if '+' in text:
+        parts = text.split('+')
+    elif not CLASS_WORDS.search(text):
+        parts = re.split(r',|\band\b|\bwith\b', text)
+    else:
+        return None
+    ingredients = {normalize_ingredient(part) for part in parts} - {''}
+    return sorted(ingredients) if len(ingredients) > 1 else None
+
+
+def normalize_ingredient(text):
+    # "Paracetamol 325 mg" and "paracetamol" are the same ingredient
+    words = re.findall(r'[a-z0-9]+', STRENGTH.sub(' ', text.lower()))
+    words = [word for word in words if word not in FORM_WORDS]
+    # "Sodium Chloride" keeps its sodium
+    while len(words) > 1 and words[-1] in SALTS and words[-2] not in SALTS:
+        words.pop()
+    return ' '.join(words)
+
+
+def normalize_substance(name):
+    # "Mepacrine Hydrochloride" is banned whatever salt is prescribed
+    words = name.lower().split()
+    while len(words) > 1 and words[-1] in SALTS:
+        words.pop()
+    return ' '.join(words)
+
+
+class AhoCorasick:
+    # Multi-pattern matcher: finds every occurrence of every pattern in one
+    # pass over the text, independent of the number of patterns. Matching is
+    # case-insensitive, any run of whitespace in the text matches a single
+    # space in a pattern, and only whole-word matches are reported.
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for index, pattern in enumerate(self.patterns):
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = next_node
+            self._out[node] += (index,)
+
+        # Breadth-first, so every node's failure link is final before its children's
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    def iter(self, text):
+        # Yields (pattern index, start, end) with offsets into text
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            lowered = ''.join(char if len(char.lower()) != 1 else char.lower() for char in text)
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        # Offsets in text of the characters fed to the automaton
+        fed = []
+        after_space = True
+        for position, char in enumerate(lowered):
+            if char.isspace():
+                if after_space:
+                    continue
+                char = ' '
+                after_space = True
+            else:
+                after_space = False
+            fed.append(position)
+
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for index in out[node]:
+                start = fed[-len(self.patterns[index])]
+                end = position + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    yield index, start, end
+
+
+def trigrams(text):
+    padded = f" {text} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    # Finds vocabulary terms that OCR misspelled. Candidates come from a
+    # trigram inverted index (count filtering: a term within k edits of a
+    # word shares all but at most 3k of its trigrams), so only terms that
+    # share most trigrams with a word are scored with rapidfuzz.
+    def __init__(self, terms, threshold=FUZZY_THRESHOLD):
+        self.terms = list(terms)
+        self.threshold = threshold
+        self._postings = {}
+        for index, term in enumerate(self.terms):
+            for gram in trigrams(term):
+                self._postings.setdefault(gram, []).append(index)
+        self._sizes = sorted({len(term.split()) for term in self.terms})
+        # Prescriptions repeat the same words ("daily", "tablet") over and over
+        self.lookup = lru_cache(maxsize=4096)(self._lookup)
+
+    def _lookup(self, text):
+        # Returns (term index, score) of the best term scoring at least the threshold, or None
+        edits = int(len(text) * (100 - self.threshold) / 100) + 1
+        grams = trigrams(text)
+        counts = {}
+        for gram in grams:
+            for index in self._postings.get(gram, ()):
+                counts[index] = counts.get(index, 0) + 1
+        best = None
+        for index, shared in counts.items():
+            term = self.terms[index]
+            if shared < len(grams) - 3 * edits or abs(len(term) - len(text)) > edits:
+                continue
+            score = fuzz.ratio(text, term, score_cutoff=self.threshold)
+            if score and (best is None or score > best[1]):
+                best = (index, score)
+        return best
+
+    def scan(self, text, skip=()):
+        # Yields (term index, start, end, score) for runs of words matching a
+        # term, leaving out runs that overlap the (start, end) spans in skip
+        if self.threshold >= 100 or not self.terms:
+            return
+        words = [(match.start(), match.end()) for match in WORD.finditer(text)]
+        for first in range(len(words)):
+            for size in self._sizes:
+                if first + size > len(words):
+                    break
+                start, end = words[first][0], words[first + size - 1][1]
+                if any(start < skip_end and skip_start < end for skip_start, skip_end in skip):
+                    continue
+                candidate = ' '.join(text[word_start:word_end].lower()
+                                     for word_start, word_end in words[first:first + size])
+                if len(candidate) < FUZZY_MIN_LENGTH:
+                    continue
+                found = self.lookup(candidate)
+                if found:
+                    yield found[0], start, end, found[1]
+
+
+class CombinationIndex:
+    # Inverted index from ingredient to the banned combinations containing it.
+    # covered() only visits the combinations of the ingredients it is given,
+    # counting hits per combination; a combination is banned for the
+    # prescription once every one of its ingredients has been counted.
+    # Entries listing the same ingredients are one combination.
+    def __init__(self, entries):
+        by_ingredients = {}
+        for entry in entries:
+            if entry['kind'] == 'combination' and entry.get('ingredients'):
+                by_ingredients.setdefault(tuple(entry['ingredients']), []).append(entry)
+        self.combinations = [{'ingredients': list(ingredients), 'entries': grouped}
+                             for ingredients, grouped in by_ingredients.items()]
+        self._required = [len(combination['ingredients']) for combination in self.combinations]
+        self._postings = {}
+        for combination_id, combination in enumerate(self.combinations):
+            for ingredient in combination['ingredients']:
+                self._postings.setdefault(ingredient, []).append(combination_id)
+
+    @property
+    def ingredients(self):
+        return list(self._postings)
+
+    def covered(self, ingredients):
+        counts = Counter()
+        for ingredient in set(ingredients):
+            counts.update(self._postings.get(ingredient, ()))
+        return [self.combinations[combination_id] for combination_id, count in sorted(counts.items())
+                if count == self._required[combination_id]]
+
+
+class BannedDrugChecker:
+    # Scans prescription text for substances on the banned list, and for
+    # banned fixed dose combinations whose ingredients all appear in it
+    def __init__(self, entries, fuzzy_threshold=FUZZY_THRESHOLD):
+        self.substances = [entry for entry in entries if entry['kind'] == 'substance']
+        names = {}
+        for entry in self.substances:
+            names.setdefault(normalize_substance(entry['name']), []).append(entry)
+        self._entries = list(names.values())
+        self._automaton = AhoCorasick(names)
+        self._fuzzy = FuzzyIndex(self._automaton.patterns, fuzzy_threshold)
+        self.combinations = CombinationIndex(entries)
+        self._ingredients = AhoCorasick(self.combinations.ingredients)
+        self._fuzzy_ingredients = FuzzyIndex(self._ingredients.patterns, fuzzy_threshold)
+
+    def check(self, text):
+        return self._check_substances(text or '') + self._check_combinations(text or '')
+
+    def _find(self, automaton, fuzzy, text):
+        # {term index: [(start, end, confidence)]}; exact matches have
+        # confidence 1.0, misspellings their similarity
+        found = {}
+        exact = []
+        for index, start, end in automaton.iter(text):
+            found.setdefault(index, []).append((start, end, 1.0))
+            exact.append((start, end))
+        for index, start, end, score in fuzzy.scan(text, exact):
+            found.setdefault(index, []).append((start, end, round(score / 100, 2)))
+        return found
+
+    def _check_combinations(self, text):
+        found = {self._ingredients.patterns[index]: matches
+                 for index, matches in self._find(self._ingredients, self._fuzzy_ingredients, text).items()}
+        warnings = []
+        for combination in self.combinations.covered(found):
+            ingredients = combination['ingredients']
+            conditional = all(entry.get('conditional') for entry in combination['entries'])
+            # As sure as the least certain ingredient
+            confidence = min(max(match[2] for match in found[ingredient]) for ingredient in ingredients)
+            warnings.append({
+                'type': 'banned_combination',
+                'ingredients': ingredients,
+                'entries': [entry['number'] for entry in combination['entries']],
+                'conditional': conditional,
+                'confidence': confidence,
+                'positions': sorted([start, end] for ingredient in ingredients for start, end, _ in found[ingredient]),
+                'message': ('' if confidence == 1.0 else 'Possible match: ')
+                           + f"Fixed dose combination of {' + '.join(ingredients)} is on the banned drugs list"
+                           f" ({'; '.join(entry['text'] for entry in combination['entries'])}).",
+            })
+        return warnings
+
+    def _check_substances(self, text):
+        # One warning per banned substance found, with every position it was found at
+        warnings = []
+        for index, matches in sorted(self._find(self._automaton, self._fuzzy, text).items(),
+                                     key=lambda item: min(item[1])):
+            entries = self._entries[index]
+            conditional = all(entry['conditional'] for entry in entries)
+            confidence = max(match[2] for match in matches)
+            warnings.append({
+                'type': 'banned_drug',
+                'drug': entries[0]['name'],
+                'entries': [entry['number'] for entry in entries],
+                'conditional': conditional,
+                'confidence': confidence,
+                'positions': sorted([start, end] for start, end, _ in matches),
+                'matched': sorted({text[start:end] for start, end, _ in matches}),
+                'message': ('' if confidence == 1.0 else 'Possible match: ')
+                           + f"{entries[0]['name']} is on the banned drugs list"
+                           + (f" ({'; '.join(entry['text'] for entry in entries)})" if conditional else '') + '.',
+            })
+        return warnings
+
+
+class BannedList:
+    # The active banned drugs index, rebuilt in the background when the PDF
+    # changes. The checker and the version it was built from are published
+    # together by one assignment, so a check never blocks on a rebuild and
+    # always uses a complete index, either the old one or the new one.
+    # Only reloads requested with reload() use worker processes: the first
+    # load runs while app.py is imported and the watcher is a thread of its own.
+    # A first load with fewer than MIN_ENTRIES entries is parsed again with
+    # FALLBACK_BACKEND, and the app refuses to start if that finds too few too.
+    def __init__(self, pdf_path=PDF_PATH, cache_path=CACHE_PATH, workers=PDF_WORKERS, backend=PDF_BACKEND):
+        self.pdf_path = pdf_path
+        self.cache_path = cache_path
+        self.workers = workers
+        self.backend = backend
+        self._reload_lock = threading.Lock()
+        self._stats = {'reloads': 0, 'reload_failures': 0}
+        self._file_state = self._stat()
+        entries, digest = load_banned_entries(pdf_path, cache_path, backend, workers=1)
+        if len(entries) < MIN_ENTRIES and backend != FALLBACK_BACKEND:
+            print(f"Warning: the {backend} backend found only {len(entries)} banned drug entries, "
+                  f"parsing {pdf_path} with {FALLBACK_BACKEND} instead")
+            self.backend = FALLBACK_BACKEND
+            entries, digest = load_banned_entries(pdf_path, cache_path, FALLBACK_BACKEND, workers=1)
+        if len(entries) < MIN_ENTRIES:
+            raise RuntimeError(f"{pdf_path} parsed into {len(entries)} banned drug entries, "
+                               f"fewer than BANNED_DRUGS_MIN_ENTRIES ({MIN_ENTRIES})")
+        self._active = (BannedDrugChecker(entries), digest, time.time(), len(entries))
+
+    def check(self, text):
+        checker, _, _, _ = self._active
+        return checker.check(text)
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.pdf_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self, workers=None):
+        # Returns whether a new index was swapped in; an unchanged PDF is left alone
+        with self._reload_lock:
+            self._file_state = self._stat()
+            _, version, _, count = self._active
+            try:
+                if file_digest(self.pdf_path) == version:
+                    return False
+                entries, digest = load_banned_entries(self.pdf_path, self.cache_path, self.backend,
+                                                      workers=self.workers if workers is None else workers)
+                if len(entries) < max(MIN_ENTRIES, MIN_ENTRY_RATIO * count):
+                    raise ValueError(f"new list has {len(entries)} entries against {count} in the current one")
+                checker = BannedDrugChecker(entries)
+            except Exception as e:
+                # Keep serving the old list, e.g. while the new PDF is still being copied
+                print(f"Error reloading banned drugs list: {e}")
+                self._stats['reload_failures'] += 1
+                raise
+            self._active = (checker, digest, time.time(), len(entries))
+            self._stats['reloads'] += 1
+            print(f"Loaded banned drugs list {digest[:12]}")
+            return True
+
+    def watch(self, interval=WATCH_INTERVAL):
+        # Poll the PDF's mtime and size from a daemon thread
+        if interval <= 0:
+            return None
+
+        def run():
+            while True:
+                time.sleep(interval)
+                if self._stat() != self._file_state:
+                    try:
+                        self.reload(workers=1)
+                    except Exception:
+                        pass
+
+        thread = threading.Thread(target=run, name='banned-drugs-watcher', daemon=True)
+        thread.start()
+        return thread
+
+    def info(self):
+        checker, version, loaded_at, count = self._active
+        return dict(self._stats, version=version, loaded_at=loaded_at, entries=count,
+                    substances=len(checker.substances), combinations=len(checker.combinations.combinations))
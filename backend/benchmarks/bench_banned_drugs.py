@@ -0,0 +1,97 @@
+# Banned-substance scan of synthetic prescriptions: Aho-Corasick automaton vs
+# one regex per banned name; and banned-combination lookup: ingredient index
+# vs checking every combination.
+#
+#   python benchmarks/bench_banned_drugs.py [prescriptions]
+#
+# The banned list is parsed from banned_drugs.pdf. Prescriptions are random
+# OCR-like texts; about one in five mentions a banned substance.
+# The checker's time includes its second automaton pass, for combination
+# ingredients.
+import os
+import random
+import re
+import sys
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND)
+
+from banned_drugs import BannedDrugChecker, load_banned_entries, normalize_substance  # noqa: E402
+
+COMMON = ("Paracetamol Amoxicillin Azithromycin Metformin Amlodipine Atorvastatin Pantoprazole "
+          "Cetirizine Ibuprofen Omeprazole Losartan Montelukast Levocetirizine Ondansetron").split()
+FILLER = ("Rx Tab Cap Syp 500mg 250mg 5ml once twice daily after food before bed for days "
+          "Dr. Patient Age Date review SOS with water").split()
+
+
+def prescription(rng, banned):
+    words = [rng.choice(FILLER) for _ in range(rng.randint(30, 80))]
+    for _ in range(rng.randint(2, 6)):
+        words.insert(rng.randrange(len(words)), rng.choice(COMMON))
+    if rng.random() < 0.2:
+        words.insert(rng.randrange(len(words)), rng.choice(banned))
+    return ' '.join(words)
+
+
+def timed(fn, texts):
+    started = time.perf_counter()
+    results = [fn(text) for text in texts]
+    return results, (time.perf_counter() - started) * 1000
+
+
+def run(count):
+    entries, _ = load_banned_entries(os.path.join(BACKEND, 'banned_drugs.pdf'), cache_path=None)
+
+    started = time.perf_counter()
+    # Exact matching only, like the regexes; bench_banned_fuzzy.py covers misspellings
+    checker = BannedDrugChecker(entries, fuzzy_threshold=100)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    names = sorted({normalize_substance(entry['name']) for entry in checker.substances})
+    patterns = [re.compile(r'\b' + re.escape(name).replace(r'\ ', r'\s+') + r'\b', re.IGNORECASE)
+                for name in names]
+
+    def regex_scan(text):
+        return {name for name, pattern in zip(names, patterns) if pattern.search(text)}
+
+    def automaton_scan(text):
+        return {normalize_substance(warning['drug']) for warning in checker.check(text)
+                if warning['type'] == 'banned_drug'}
+
+    rng = random.Random(15)
+    banned = [entry['name'] for entry in checker.substances]
+    texts = [prescription(rng, banned) for _ in range(count)]
+
+    expected, regex_ms = timed(regex_scan, texts)
+    found, automaton_ms = timed(automaton_scan, texts)
+    assert found == expected, "automaton and regex scans disagree"
+
+    print(f"{len(names)} banned substances, automaton built in {build_ms:.1f} ms")
+    print(f"{count} prescriptions, {sum(1 for hits in found if hits)} with a banned substance")
+    print(f"{'scan':>10} {'total ms':>10} {'us/prescription':>16}")
+    for label, elapsed in (('regex', regex_ms), ('checker', automaton_ms)):
+        print(f"{label:>10} {elapsed:>10.1f} {elapsed / count * 1000:>16.1f}")
+
+    index = checker.combinations
+    ingredients = index.ingredients
+    prescribed = [rng.sample(ingredients, rng.randint(1, 6)) for _ in range(count)]
+
+    def linear_lookup(names):
+        names = set(names)
+        return [combination for combination in index.combinations if names.issuperset(combination['ingredients'])]
+
+    expected, linear_ms = timed(linear_lookup, prescribed)
+    found, index_ms = timed(index.covered, prescribed)
+    assert found == expected, "index and linear combination lookups disagree"
+
+    print()
+    print(f"{len(index.combinations)} banned combinations over {len(ingredients)} ingredients, "
+          f"{sum(1 for hits in found if hits)} of {count} ingredient sets hit one")
+    print(f"{'lookup':>10} {'total ms':>10} {'us/prescription':>16}")
+    for label, elapsed in (('linear', linear_ms), ('index', index_ms)):
+        print(f"{label:>10} {elapsed:>10.1f} {elapsed / count * 1000:>16.1f}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
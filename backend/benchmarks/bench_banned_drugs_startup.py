@@ -0,0 +1,49 @@
+# Startup cost of the banned drugs list: parsing banned_drugs.pdf vs loading
+# the parsed entries from the cache file.
+#
+#   python benchmarks/bench_banned_drugs_startup.py [rounds]
+#
+# Uses a temporary cache file, so the cache next to the app is left alone.
+import os
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND)
+
+from banned_drugs import BannedDrugChecker, load_banned_entries  # noqa: E402
+
+PDF = os.path.join(BACKEND, 'banned_drugs.pdf')
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run(rounds):
+    with tempfile.TemporaryDirectory() as directory:
+        cache = os.path.join(directory, 'banned_drugs.cache.json')
+        cold = []
+        warm = []
+        for _ in range(rounds):
+            if os.path.exists(cache):
+                os.remove(cache)
+            (parsed, _), elapsed = timed(lambda: load_banned_entries(PDF, cache))
+            cold.append(elapsed)
+            (cached, _), elapsed = timed(lambda: load_banned_entries(PDF, cache))
+            warm.append(elapsed)
+            assert cached == parsed, "cached entries differ from parsed ones"
+        size = os.path.getsize(cache)
+
+    _, build_ms = timed(lambda: BannedDrugChecker(cached))
+    print(f"{len(cached)} entries, cache file {size / 1024:.1f} KiB, checker built in {build_ms:.1f} ms")
+    print(f"{'load':>12} {'avg ms':>9} {'min ms':>9}")
+    for label, times in (('parse PDF', cold), ('from cache', warm)):
+        print(f"{label:>12} {sum(times) / rounds:>9.1f} {min(times):>9.1f}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
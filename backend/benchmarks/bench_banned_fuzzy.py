@@ -0,0 +1,106 @@
+# Recall and latency of banned-drug detection on OCR-like noisy text, exact
+# matching only vs exact plus fuzzy matching; and fuzzy lookup through the
+# trigram index vs scoring every vocabulary term.
+#
+#   python benchmarks/bench_banned_fuzzy.py [prescriptions]
+#
+# Each noisy prescription mentions one banned substance with one or two
+# OCR-style errors (l/1, O/0, rn/m, dropped or doubled letters). Clean
+# prescriptions mention none and count false positives.
+import os
+import random
+import sys
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND)
+
+from rapidfuzz import fuzz, process  # noqa: E402
+
+from banned_drugs import (FUZZY_THRESHOLD, BannedDrugChecker, FuzzyIndex, load_banned_entries,  # noqa: E402
+                          normalize_substance)
+
+COMMON = ("Paracetamol Amoxicillin Azithromycin Metformin Amlodipine Atorvastatin Pantoprazole "
+          "Cetirizine Ibuprofen Omeprazole Losartan Montelukast Levocetirizine Ondansetron").split()
+FILLER = ("Rx Tab Cap Syp 500mg 250mg 5ml once twice daily after food before bed for days "
+          "Dr. Patient Age Date review SOS with water").split()
+CONFUSIONS = [('l', '1'), ('i', 'l'), ('o', '0'), ('m', 'rn'), ('e', 'c'), ('a', 'o'), ('n', 'h')]
+
+
+def misspell(rng, name):
+    for _ in range(rng.randint(1, 2)):
+        roll = rng.random()
+        if roll < 0.5:
+            options = [(a, b) for a, b in CONFUSIONS if a in name]
+            if options:
+                a, b = rng.choice(options)
+                index = rng.choice([i for i in range(len(name)) if name.startswith(a, i)])
+                name = name[:index] + b + name[index + len(a):]
+                continue
+        index = rng.randrange(1, len(name) - 1)
+        name = name[:index] + name[index + 1:] if roll < 0.75 else name[:index] + name[index] + name[index:]
+    return name
+
+
+def prescription(rng, extra=None):
+    words = [rng.choice(FILLER) for _ in range(rng.randint(30, 80))]
+    for _ in range(rng.randint(2, 6)):
+        words.insert(rng.randrange(len(words)), rng.choice(COMMON))
+    if extra:
+        words.insert(rng.randrange(len(words)), extra)
+    return ' '.join(words)
+
+
+def detect(checker, texts):
+    started = time.perf_counter()
+    results = [{warning['drug'] for warning in checker.check(text) if warning['type'] == 'banned_drug'}
+               for text in texts]
+    return results, (time.perf_counter() - started) * 1000
+
+
+def run(count):
+    entries, _ = load_banned_entries(os.path.join(BACKEND, 'banned_drugs.pdf'), cache_path=None)
+    rng = random.Random(20)
+    fuzzy_checker = BannedDrugChecker(entries)
+    exact_checker = BannedDrugChecker(entries, fuzzy_threshold=100)
+
+    names = [entry['name'] for entry in fuzzy_checker.substances if len(entry['name']) >= 6]
+    planted = [rng.choice(names) for _ in range(count)]
+    noisy = [prescription(rng, misspell(rng, name)) for name in planted]
+    clean = [prescription(rng) for _ in range(count)]
+
+    print(f"{count} noisy prescriptions (one misspelled banned name each), {count} clean ones, "
+          f"threshold {FUZZY_THRESHOLD:g}")
+    print(f"{'matching':>14} {'recall':>7} {'false pos.':>11} {'us/prescription':>16}")
+    for label, checker in (('exact', exact_checker), ('exact + fuzzy', fuzzy_checker)):
+        found, noisy_ms = detect(checker, noisy)
+        false_positives, clean_ms = detect(checker, clean)
+        recall = sum(1 for name, hits in zip(planted, found) if name in hits) / count
+        fp_rate = sum(1 for hits in false_positives if hits) / count
+        print(f"{label:>14} {recall:>7.1%} {fp_rate:>11.1%} {(noisy_ms + clean_ms) / (2 * count) * 1000:>16.1f}")
+
+    # Lookup cost against the whole banned vocabulary, substances and combination ingredients
+    vocabulary = sorted({normalize_substance(entry['name']) for entry in fuzzy_checker.substances}
+                        | set(fuzzy_checker.combinations.ingredients))
+    index = FuzzyIndex(vocabulary)
+    queries = [misspell(rng, rng.choice(vocabulary)) for _ in range(count)] + \
+              [rng.choice(COMMON + FILLER).lower() for _ in range(count)]
+
+    started = time.perf_counter()
+    indexed = [index.lookup(query) for query in queries]
+    index_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    linear = [process.extractOne(query, vocabulary, scorer=fuzz.ratio, score_cutoff=FUZZY_THRESHOLD)
+              for query in queries]
+    linear_ms = (time.perf_counter() - started) * 1000
+    agree = sum(1 for a, b in zip(indexed, linear) if (a is None) == (b is None)) / len(queries)
+
+    print()
+    print(f"{len(queries)} lookups against {len(vocabulary)} terms, index agrees with linear scan on {agree:.1%}")
+    print(f"{'lookup':>14} {'us/lookup':>10}")
+    for label, elapsed in (('linear scan', linear_ms), ('trigram index', index_ms)):
+        print(f"{label:>14} {elapsed / len(queries) * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,63 @@
+# Prompt growth of a mental health session with and without ConversationMemory.
+#
+#   python benchmarks/bench_chat_memory.py
+#
+# The model is not called: the summarizer is a stand-in that returns a summary
+# of bounded size, and prompt size (estimated tokens) is reported as the proxy
+# for model latency. Time is the local cost of building the prompt and
+# compacting the session per turn.
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sessions import ChatSession, ConversationMemory, estimate_tokens  # noqa: E402
+
+CHECKPOINTS = [10, 25, 50, 100, 200, 400]
+WORDS = ("feel anxious work sleep family stress tired support breathing walk friends "
+         "worried exam panic calm routine journal therapy morning night").split()
+
+
+def message(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def fake_summarize(summary, transcript):
+    # Bounded like the real 150-word summary
+    return (summary + ' ' + transcript)[-900:]
+
+
+def run():
+    rng = random.Random(7)
+    memory = ConversationMemory(fake_summarize)
+    session = ChatSession()
+    full_history = []
+
+    print(f"{'exch.':>6} {'full tokens':>12} {'memory tokens':>14} {'memory us/turn':>15}")
+    elapsed = 0.0
+    for turn in range(1, CHECKPOINTS[-1] + 1):
+        user_text = message(rng, 25)
+        reply = message(rng, 120)
+
+        started = time.perf_counter()
+        prompt_context = memory.context(session)
+        session.add_turn('user', user_text)
+        session.add_turn('bot', reply)
+        memory.compact(session)
+        elapsed += time.perf_counter() - started
+
+        full_history.append(f"user: {user_text}")
+        full_history.append(f"bot: {reply}")
+
+        if turn in CHECKPOINTS:
+            full_tokens = estimate_tokens('\n'.join(full_history[:-2]))
+            print(f"{turn:>6} {full_tokens:>12} {estimate_tokens(prompt_context):>14} "
+                  f"{elapsed / turn * 1e6:>15.1f}")
+
+    print(f"summaries generated: {memory.stats()['summaries']} over {CHECKPOINTS[-1]} exchanges")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,80 @@
+# Near-duplicate lookup in the image result cache: multi-index hashing vs
+# comparing the dHash of every entry; and the dHash distance of re-encoded,
+# rescaled and slightly rotated copies of the sample images.
+#
+#   python benchmarks/bench_image_cache.py [entries] [lookups]
+#
+# Cached hashes are random; half of the lookups are a cached hash with a few
+# bits flipped, the rest are new images.
+import io
+import os
+import random
+import sys
+import time
+
+from PIL import Image, ImageEnhance
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND)
+
+from image_cache import HASH_SIZE, MAX_DISTANCE, HammingIndex, dhash, hamming  # noqa: E402
+
+FIXTURES = ['9.jpg', '90.jpg']
+BITS = HASH_SIZE * HASH_SIZE
+
+
+def variants(image):
+    reencoded = io.BytesIO()
+    image.save(reencoded, format='JPEG', quality=60)
+    yield 'jpeg q60', Image.open(io.BytesIO(reencoded.getvalue()))
+    yield '2x larger', image.resize((image.width * 2, image.height * 2))
+    yield 'brighter', ImageEnhance.Brightness(image).enhance(1.15)
+    yield 'rotated 2deg', image.rotate(2, fillcolor='white')
+
+
+def run(count, lookups):
+    rng = random.Random(22)
+    hashes = [rng.getrandbits(BITS) for _ in range(count)]
+    index = HammingIndex(BITS, MAX_DISTANCE)
+    for item, value in enumerate(hashes):
+        index.add('bench', value, item)
+
+    queries = []
+    for _ in range(lookups):
+        value = rng.choice(hashes) if rng.random() < 0.5 else rng.getrandbits(BITS)
+        for _ in range(rng.randint(0, MAX_DISTANCE)):
+            value ^= 1 << rng.randrange(BITS)
+        queries.append(value)
+
+    def linear(value):
+        return {item for item, candidate in enumerate(hashes) if hamming(value, candidate) <= MAX_DISTANCE}
+
+    def indexed(value):
+        return {item for item in index.candidates('bench', value) if hamming(value, hashes[item]) <= MAX_DISTANCE}
+
+    results = {}
+    for label, lookup in (('linear', linear), ('index', indexed)):
+        started = time.perf_counter()
+        results[label] = [lookup(value) for value in queries]
+        results[label + '_ms'] = (time.perf_counter() - started) * 1000
+    assert results['linear'] == results['index'], "index and linear lookups disagree"
+
+    print(f"{count} cached hashes, max distance {MAX_DISTANCE}, "
+          f"{sum(1 for found in results['index'] if found)} of {lookups} lookups hit")
+    print(f"{'lookup':>10} {'total ms':>10} {'us/lookup':>10}")
+    for label in ('linear', 'index'):
+        print(f"{label:>10} {results[label + '_ms']:>10.1f} {results[label + '_ms'] / lookups * 1000:>10.1f}")
+
+    print()
+    print(f"{'image':>10} {'variant':>14} {'distance':>9} {'reused':>7}")
+    for name in FIXTURES:
+        image = Image.open(os.path.join(BACKEND, name)).convert('RGB')
+        original = dhash(image)
+        for label, variant in variants(image):
+            distance = hamming(original, dhash(variant))
+            print(f"{name:>10} {label:>14} {distance:>9} {'yes' if distance <= MAX_DISTANCE else 'no':>7}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
@@ -0,0 +1,109 @@
+# Bytes sent to Gemini and preprocessing time per stage for the sample images.
+# "upload" is the file size, "sdk" what the SDK sent when handed the decoded
+# RGB image (as the app did before preprocessing), "prepared" what
+# prepare_image() sends.
+#
+#   python benchmarks/bench_image_prep.py [rounds] [image ...]
+#   GEMINI_API_KEY=... python benchmarks/bench_image_prep.py [rounds] [image ...]
+#
+# With GEMINI_API_KEY set, the prescription OCR call is also timed for both
+# versions of each image. Without image arguments the samples in backend/ are
+# used, plus a 12 MP JPEG upscaled from one of them to stand in for a phone
+# photo.
+import io
+import os
+import sys
+import time
+
+from PIL import Image
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND)
+
+from image_prep import PROFILES, PreparedImage, open_upload, prepare_image  # noqa: E402
+from uploads import ImageUpload  # noqa: E402
+
+FIXTURES = [os.path.join(BACKEND, name) for name in ('9.jpg', '90.jpg')]
+
+
+def phone_photo():
+    # A 12 MP JPEG like a phone camera's, made by upscaling a sample
+    image = Image.open(FIXTURES[0]).convert('RGB').resize((4032, 3024), Image.BICUBIC)
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=92)
+    return buffer.getvalue()
+
+
+def prepare(data, profile, rounds):
+    # Decoding includes the reduced-size JPEG decode open_upload() asks for
+    totals = {}
+    for _ in range(rounds):
+        upload = ImageUpload(io.BytesIO(data))
+        started = time.perf_counter()
+        image = open_upload(upload, profile)
+        decode_ms = (time.perf_counter() - started) * 1000
+        prepared = prepare_image(image, profile, original=upload)
+        for stage, duration in dict(prepared.timings, decode=decode_ms).items():
+            totals[stage] = totals.get(stage, 0.0) + duration
+    return prepared, {stage: total / rounds for stage, total in totals.items()}
+
+
+def ocr_latency(interpreter, image, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        interpreter.extract_text_from_image(image)
+    return (time.perf_counter() - started) * 1000 / rounds
+
+
+def run(rounds, images):
+    stages = ('decode', 'transpose', 'resize', 'normalize', 'encode')
+    print(f"{'image':>10} {'profile':>12} {'size':>11} {'prepared':>11} {'upload':>8} {'sdk':>8} {'prepared':>9} "
+          + ' '.join(f"{stage + ' ms':>12}" for stage in stages))
+    prepared_images = []
+    for name, data in images:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        sdk_bytes = sdk_image(image).bytes
+        for profile in PROFILES:
+            prepared, timings = prepare(data, profile, rounds)
+            print(f"{name:>10} {profile:>12} {'x'.join(map(str, image.size)):>11} "
+                  f"{'x'.join(map(str, prepared.image.size)):>11} {prepared.original_bytes:>8} "
+                  f"{sdk_bytes:>8} {prepared.bytes:>9} " + ' '.join(f"{timings[stage]:>12.2f}" for stage in stages))
+            if profile == 'prescription':
+                prepared_images.append((name, image, prepared))
+
+    if not os.getenv('GEMINI_API_KEY'):
+        return
+
+    # app.py loads banned_drugs.pdf from the working directory
+    os.chdir(BACKEND)
+    from app import PrescriptionInterpreter
+    from llm import LLMRegistry
+    interpreter = PrescriptionInterpreter(LLMRegistry(os.environ['GEMINI_API_KEY']))
+
+    print()
+    print(f"{'image':>10} {'ocr ms':>9} {'prepared':>9} {'reduction':>10}")
+    for name, image, prepared in prepared_images:
+        original_ms = ocr_latency(interpreter, sdk_image(image), rounds)
+        prepared_ms = ocr_latency(interpreter, prepared, rounds)
+        print(f"{name:>10} {original_ms:>9.0f} {prepared_ms:>9.0f} "
+              f"{1 - prepared_ms / original_ms:>10.0%}")
+
+
+def sdk_image(image):
+    # What the SDK sent for the full-resolution RGB image before preprocessing;
+    # its PIL conversion is a JPEG at Pillow's default quality
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, format='JPEG')
+    return PreparedImage(image, {'mime_type': 'image/jpeg', 'data': buffer.getvalue()}, {})
+
+
+if __name__ == '__main__':
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    images = []
+    for path in sys.argv[2:] or FIXTURES:
+        with open(path, 'rb') as file:
+            images.append((os.path.basename(path), file.read()))
+    if len(sys.argv) <= 2:
+        images.append(('12mp.jpg', phone_photo()))
+    run(rounds, images)
@@ -0,0 +1,52 @@
+# Page text extraction of banned_drugs.pdf per backend, in one process and in
+# a process pool, streamed into the banned list parser.
+#
+#   python benchmarks/bench_pdf_backends.py [workers]
+#
+# Reports time to the first page, total time and the number of entries the
+# parser found, which shows how well each backend's text layout parses.
+import os
+import sys
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND)
+
+from banned_drugs import iter_banned_entries  # noqa: E402
+from pdf_ingest import BACKENDS, iter_page_texts  # noqa: E402
+
+PDF = os.path.join(BACKEND, 'banned_drugs.pdf')
+
+
+def measure(backend, workers):
+    started = time.perf_counter()
+    first_page = []
+
+    def pages():
+        for text in iter_page_texts(PDF, backend, workers):
+            if not first_page:
+                first_page.append(time.perf_counter() - started)
+            yield text
+
+    entries = list(iter_banned_entries(pages()))
+    return first_page[0] * 1000, (time.perf_counter() - started) * 1000, entries
+
+
+def run(workers):
+    print(f"{'backend':>10} {'workers':>8} {'first page ms':>14} {'total ms':>10} {'entries':>8} "
+          f"{'substances':>11} {'combinations':>13}")
+    for backend in BACKENDS:
+        for pool in sorted({1, workers}):
+            try:
+                first_ms, total_ms, entries = measure(backend, pool)
+            except Exception as e:
+                print(f"{backend:>10} {pool:>8} unavailable: {e}")
+                break
+            substances = sum(1 for entry in entries if entry['kind'] == 'substance')
+            combinations = sum(1 for entry in entries if entry.get('ingredients'))
+            print(f"{backend:>10} {pool:>8} {first_ms:>14.0f} {total_ms:>10.0f} {len(entries):>8} "
+                  f"{substances:>11} {combinations:>13}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else min(4, os.cpu_count() or 1))
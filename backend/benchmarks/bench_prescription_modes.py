@@ -0,0 +1,61 @@
+# Latency and token usage of the two /interpret modes on the sample prescriptions.
+#
+#   GEMINI_API_KEY=... python benchmarks/bench_prescription_modes.py [rounds] [image ...]
+#
+# Calls the real model. "two_call" is OCR followed by interpretation of the
+# extracted text; "structured" is the single schema-constrained call. The
+# inventory comparison is the same in both modes and is left out.
+import os
+import sys
+import time
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND)
+INVOKED_FROM = os.getcwd()
+# app.py loads banned_drugs.pdf from the working directory
+os.chdir(BACKEND)
+
+from PIL import Image  # noqa: E402
+
+from app import PrescriptionInterpreter  # noqa: E402
+from llm import LLMRegistry  # noqa: E402
+
+FIXTURES = ['9.jpg', '90.jpg']
+MODES = {
+    'two_call': ('prescription', lambda interpreter, image: interpreter.interpret_prescription(image)),
+    'structured': ('prescription_structured', lambda interpreter, image: interpreter.interpret_structured(image)),
+}
+
+
+def run(rounds, images):
+    llm = LLMRegistry(os.environ['GEMINI_API_KEY'])
+    interpreter = PrescriptionInterpreter(llm)
+
+    print(f"{'image':>10} {'mode':>11} {'avg ms':>9} {'max ms':>9} {'calls':>6} "
+          f"{'prompt tok':>11} {'output tok':>11} {'meds':>5}")
+    for path in images:
+        image = Image.open(path)
+        image.load()
+        for mode, (profile, interpret) in MODES.items():
+            before = llm.stats().get(profile, {})
+            elapsed = []
+            medications = None
+            for _ in range(rounds):
+                started = time.perf_counter()
+                result = interpret(interpreter, image)
+                elapsed.append((time.perf_counter() - started) * 1000)
+                if result.get('prescription'):
+                    medications = len(result['prescription'].get('medications') or [])
+            after = llm.stats()[profile]
+            calls = after['calls'] - before.get('calls', 0)
+            prompt_tokens = (after['prompt_tokens'] - before.get('prompt_tokens', 0)) // rounds
+            output_tokens = (after['output_tokens'] - before.get('output_tokens', 0)) // rounds
+            print(f"{os.path.basename(path):>10} {mode:>11} {sum(elapsed) / rounds:>9.0f} {max(elapsed):>9.0f} "
+                  f"{calls // rounds:>6} {prompt_tokens:>11} {output_tokens:>11} "
+                  f"{'-' if medications is None else medications:>5}")
+
+
+if __name__ == '__main__':
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    images = [os.path.join(INVOKED_FROM, path) for path in sys.argv[2:]] or FIXTURES
+    run(rounds, images)
@@ -0,0 +1,159 @@
+import os
+import queue
+import threading
+import time
+
+import mysql.connector
+from mysql.connector import Error
+
+db_config = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'user': os.getenv('DB_USER', 'root'),
+    'password': os.getenv('DB_PASSWORD', 'root'),
+    'database': os.getenv('DB_NAME', 'medicine')
+}
+
+# Pool tuning, overridable per deployment
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '5'))
+# Connections idle for longer than this are pinged before being handed out
+POOL_VALIDATE_AFTER = float(os.getenv('DB_POOL_VALIDATE_AFTER', '30'))
+
+
+class PoolTimeoutError(Error):
+    pass
+
+
+class PooledConnection:
+    # Proxies a pooled MySQL connection; close() returns it to the pool
+    # instead of tearing down the socket.
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def is_connected(self):
+        # Liveness is checked on checkout, so routes don't pay for a ping
+        # round trip in their finally blocks.
+        return not self._released
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._connection)
+
+
+class ConnectionPool:
+    def __init__(self, config, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 validate_after=POOL_VALIDATE_AFTER):
+        self._config = config
+        self.size = size
+        self.timeout = timeout
+        self.validate_after = validate_after
+        # LIFO keeps a small hot set of connections busy and lets the rest go stale
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._stats = {
+            'created': 0,
+            'reconnects': 0,
+            'discarded': 0,
+            'checkouts': 0,
+            'in_use': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'checkout_ms_total': 0.0,
+            'checkout_ms_max': 0.0,
+        }
+
+    def _bump(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _connect(self):
+        connection = mysql.connector.connect(**self._config)
+        self._bump('created')
+        return connection
+
+    def _validate(self, connection, last_used):
+        if time.monotonic() - last_used < self.validate_after:
+            return connection
+        try:
+            connection.ping(reconnect=False)
+            return connection
+        except Error:
+            pass
+        try:
+            connection.reconnect(attempts=1)
+            self._bump('reconnects')
+            return connection
+        except Error as e:
+            print(f"Discarding stale MySQL connection: {e}")
+            self._bump('discarded')
+            return None
+
+    def get_connection(self):
+        started = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            self._bump('waits')
+            if not self._slots.acquire(timeout=self.timeout):
+                self._bump('timeouts')
+                raise PoolTimeoutError(
+                    msg=f"No database connection available within {self.timeout}s")
+
+        try:
+            connection = None
+            while connection is None:
+                try:
+                    idle_connection, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    connection = self._connect()
+                    break
+                connection = self._validate(idle_connection, last_used)
+        except Exception:
+            self._slots.release()
+            raise
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            self._stats['checkout_ms_total'] += elapsed_ms
+            self._stats['checkout_ms_max'] = max(self._stats['checkout_ms_max'], elapsed_ms)
+        return PooledConnection(self, connection)
+
+    def release(self, connection):
+        try:
+            if connection.unread_result:
+                connection.consume_results()
+            if connection.in_transaction:
+                connection.rollback()
+            self._idle.put((connection, time.monotonic()))
+        except Exception as e:
+            print(f"Dropping MySQL connection on release: {e}")
+            self._bump('discarded')
+            try:
+                connection.close()
+            except Exception:
+                pass
+        finally:
+            self._bump('in_use', -1)
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['size'] = self.size
+        stats['idle'] = self._idle.qsize()
+        checkouts = stats['checkouts']
+        stats['checkout_ms_avg'] = round(stats['checkout_ms_total'] / checkouts, 3) if checkouts else 0.0
+        stats['checkout_ms_total'] = round(stats['checkout_ms_total'], 3)
+        stats['checkout_ms_max'] = round(stats['checkout_ms_max'], 3)
+        return stats
+
+
+db_pool = ConnectionPool(db_config)
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+CACHE_SIZE = int(os.getenv('IMAGE_CACHE_SIZE', '512'))
+CACHE_TTL = int(os.getenv('IMAGE_CACHE_TTL', '3600'))
+# Differing bits (of 256) up to which two images' dHashes count as the same
+# picture, e.g. the same photo re-encoded. 0 only reuses identical files.
+MAX_DISTANCE = int(os.getenv('IMAGE_CACHE_MAX_DISTANCE', '8'))
+# Width/height ratios further apart than this are never the same picture
+MAX_ASPECT_DIFFERENCE = 0.05
+
+HASH_SIZE = 16
+
+
+def dhash(image, size=HASH_SIZE):
+    # Difference hash: one bit per horizontally adjacent pair of pixels of a
+    # (size + 1) x size grayscale thumbnail, set where brightness increases
+    pixels = list(image.convert('L').resize((size + 1, size), Image.BOX).getdata())
+    value = 0
+    for row in range(size):
+        for column in range(size):
+            offset = row * (size + 1) + column
+            value = (value << 1) | (pixels[offset] < pixels[offset + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def image_key(digest, image):
+    # (SHA-256 of the uploaded bytes, dHash, aspect ratio) of an upload
+    return digest, dhash(image), image.width / image.height
+
+
+class HammingIndex:
+    # Multi-index hashing. Hashes are split into max_distance + 1 blocks; two
+    # hashes at most max_distance bits apart agree exactly on at least one
+    # block, so a lookup only compares the entries sharing a block with it
+    # instead of every entry.
+    def __init__(self, bits, max_distance):
+        blocks = max_distance + 1
+        self._blocks = []
+        shift = 0
+        for block in range(blocks):
+            width = bits // blocks + (1 if block < bits % blocks else 0)
+            self._blocks.append((shift, (1 << width) - 1))
+            shift += width
+        self._tables = [{} for _ in self._blocks]
+
+    def _keys(self, scope, value):
+        return [(scope, (value >> shift) & mask) for shift, mask in self._blocks]
+
+    def add(self, scope, value, item):
+        for table, key in zip(self._tables, self._keys(scope, value)):
+            table.setdefault(key, set()).add(item)
+
+    def remove(self, scope, value, item):
+        for table, key in zip(self._tables, self._keys(scope, value)):
+            items = table.get(key)
+            if items is not None:
+                items.discard(item)
+                if not items:
+                    del table[key]
+
+    def candidates(self, scope, value):
+        found = set()
+        for table, key in zip(self._tables, self._keys(scope, value)):
+            found.update(table.get(key, ()))
+        return found
+
+
+class ImageResultCache:
+    # Results computed from an uploaded image, found again for the same file or
+    # for a near-identical picture of the same thing. Entries live in a scope
+    # (e.g. one endpoint and user) and are only matched within it. Lookups
+    # with near=False only find the same file: documents look alike at hash
+    # size, e.g. two prescriptions on one letterhead hash a bit or two apart.
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL, max_distance=MAX_DISTANCE):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_distance = max_distance
+        # (scope, digest) -> (dhash, aspect, value, expires_at), least recently used first
+        self._entries = OrderedDict()
+        self._index = HammingIndex(HASH_SIZE * HASH_SIZE, max_distance)
+        self._lock = threading.Lock()
+        self._stats = {'exact_hits': 0, 'near_hits': 0, 'misses': 0}
+
+    def _remove(self, item):
+        phash = self._entries.pop(item)[0]
+        self._index.remove(item[0], phash, item)
+
+    def _nearest(self, scope, phash, aspect, now):
+        best = None
+        for item in self._index.candidates(scope, phash):
+            candidate_hash, candidate_aspect, _, expires_at = self._entries[item]
+            distance = hamming(phash, candidate_hash)
+            if (expires_at > now and distance <= self.max_distance
+                    and abs(candidate_aspect - aspect) <= MAX_ASPECT_DIFFERENCE * aspect
+                    and (best is None or distance < best[0])):
+                best = (distance, item)
+        return best[1] if best else None
+
+    def get(self, scope, key, near=True):
+        digest, phash, aspect = key
+        now = time.time()
+        with self._lock:
+            item = (scope, digest)
+            entry = self._entries.get(item)
+            if entry is not None and entry[3] > now:
+                self._stats['exact_hits'] += 1
+            else:
+                item = self._nearest(scope, phash, aspect, now) if near else None
+                if item is None:
+                    self._stats['misses'] += 1
+                    return None
+                self._stats['near_hits'] += 1
+            self._entries.move_to_end(item)
+            return self._entries[item][2]
+
+    def put(self, scope, key, value):
+        digest, phash, aspect = key
+        item = (scope, digest)
+        with self._lock:
+            if item in self._entries:
+                self._remove(item)
+            self._entries[item] = (phash, aspect, value, time.time() + self.ttl)
+            self._index.add(scope, phash, item)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
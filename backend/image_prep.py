@@ -0,0 +1,119 @@
+import io
+import os
+import time
+
+from PIL import Image, ImageOps
+
+# Encoding of the images sent to Gemini: JPEG or WEBP
+IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', 'JPEG').upper()
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', '85'))
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp', 'PNG': 'image/png'}
+EXIF_ORIENTATION = 0x0112
+
+# Prescriptions are read as text: grayscale with stretched contrast keeps faint
+# handwriting legible at a fraction of the bytes. Health photos keep their
+# colour, which matters for rashes and wounds.
+PROFILES = {
+    'prescription': {
+        'max_dimension': int(os.getenv('IMAGE_MAX_DIMENSION_PRESCRIPTION', '1600')),
+        'grayscale': os.getenv('IMAGE_PRESCRIPTION_GRAYSCALE', '1') == '1',
+    },
+    'health': {
+        'max_dimension': int(os.getenv('IMAGE_MAX_DIMENSION_HEALTH', '1280')),
+        'grayscale': False,
+    },
+}
+
+
+class PreparedImage:
+    # An upload after preprocessing. blob is the inline-data part
+    # generate_content() accepts; timings are the milliseconds each stage took.
+    def __init__(self, image, blob, timings, original_bytes=None):
+        self.image = image
+        self.blob = blob
+        self.timings = timings
+        self.original_bytes = original_bytes
+
+    @property
+    def bytes(self):
+        return len(self.blob['data'])
+
+
+def _encode(image, lossless):
+    buffer = io.BytesIO()
+    if lossless:
+        image.save(buffer, format='PNG', optimize=True)
+        return {'mime_type': MIME_TYPES['PNG'], 'data': buffer.getvalue()}
+    if IMAGE_FORMAT == 'WEBP':
+        image.save(buffer, format='WEBP', quality=IMAGE_QUALITY, method=4)
+    else:
+        image.save(buffer, format='JPEG', quality=IMAGE_QUALITY, optimize=True)
+    return {'mime_type': MIME_TYPES[IMAGE_FORMAT], 'data': buffer.getvalue()}
+
+
+def open_upload(upload, profile):
+    # Decodes an uploads.ImageUpload no larger than the profile needs
+    settings = PROFILES[profile]
+    return upload.open(settings['max_dimension'], 'L' if settings['grayscale'] else None)
+
+
+def prepare_image(image, profile='prescription', original=None):
+    # Orients, downsizes, normalizes and re-encodes an opened upload. original
+    # is the uploads.ImageUpload it was opened from: an upload that needed no
+    # rotation or resizing is sent as it is when re-encoding wouldn't make it
+    # smaller. The caller's image is never modified.
+    settings = PROFILES[profile]
+    source_format = image.format
+    # Palette and bilevel uploads are scans and screenshots: PNG keeps them
+    # sharp and is smaller than a photo codec would make them
+    lossless = image.mode in ('1', 'P')
+    timings = {}
+    lap = time.perf_counter()
+
+    def timed(stage):
+        nonlocal lap
+        now = time.perf_counter()
+        timings[stage] = round((now - lap) * 1000, 1)
+        lap = now
+
+    changed = False
+    if image.getexif().get(EXIF_ORIENTATION, 1) != 1:
+        image = ImageOps.exif_transpose(image)
+        changed = True
+    timed('transpose')
+
+    max_dimension = settings['max_dimension']
+    if max(image.size) > max_dimension:
+        # Palette images only resize with nearest-neighbour sampling; once
+        # resampled they are no longer flat colour and encode best as photos
+        if lossless:
+            image = image.convert('L' if settings['grayscale'] else 'RGB')
+            lossless = False
+        scale = max_dimension / max(image.size)
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        # reducing_gap shrinks by whole factors first, then resamples the rest
+        image = image.resize(size, Image.LANCZOS, reducing_gap=3.0)
+        changed = True
+    timed('resize')
+
+    if settings['grayscale']:
+        image = ImageOps.autocontrast(image.convert('L'), cutoff=1)
+    elif image.mode != 'RGB' and not (lossless and image.mode == 'P'):
+        image = image.convert('RGB')
+    timed('normalize')
+
+    blob = _encode(image, lossless)
+    if (original is not None and not changed and not original.reduced and source_format in MIME_TYPES
+            and original.size <= len(blob['data'])):
+        blob = {'mime_type': MIME_TYPES[source_format], 'data': original.read()}
+    timed('encode')
+
+    return PreparedImage(image, blob, timings, original.size if original is not None else None)
+
+
+def image_blob(image, profile):
+    # The part to send for an image that may not have been prepared yet
+    if not isinstance(image, PreparedImage):
+        image = prepare_image(image, profile)
+    return image.blob
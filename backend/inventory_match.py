@@ -0,0 +1,135 @@
+import os
+import re
+from datetime import date, datetime
+
+from rapidfuzz import fuzz, process
+
+# token_sort_ratio score (0-100) a normalized inventory name needs to count as
+# the prescribed medicine. Similar names are often different drugs
+# ("Prednisone", "Prednisolone"), so by default only the same name counts and
+# the rest is left to the model.
+MATCH_THRESHOLD = int(os.getenv('INVENTORY_MATCH_THRESHOLD', '100'))
+
+STRENGTH = re.compile(r'\d+(?:\.\d+)?\s*(?:mg|mcg|µg|g|ml|iu|units?|%)(?:\s*/\s*\d*(?:\.\d+)?\s*(?:mg|ml|g))?\b',
+                      re.IGNORECASE)
+DOSE_FORMS = {
+    'tab', 'tabs', 'tablet', 'tablets', 'cap', 'caps', 'capsule', 'capsules', 'syp', 'syrup',
+    'susp', 'suspension', 'inj', 'injection', 'cream', 'ointment', 'gel', 'drops', 'drop',
+    'sr', 'er', 'xr', 'cr', 'mr', 'od', 'dt', 'ds',
+}
+# Salt and ester suffixes: "Metformin Hydrochloride" is stocked as "Metformin"
+SALTS = {
+    'hcl', 'hydrochloride', 'hydrobromide', 'sodium', 'potassium', 'calcium', 'magnesium',
+    'sulfate', 'sulphate', 'maleate', 'besylate', 'besilate', 'citrate', 'phosphate',
+    'mesylate', 'tartrate', 'succinate', 'acetate', 'fumarate', 'bromide', 'chloride',
+    'dihydrate', 'monohydrate', 'trihydrate',
+}
+
+STATUS_LABELS = {
+    'available': 'Available',
+    'expired': 'Expired in inventory',
+    'out_of_stock': 'Out of stock',
+    'unmatched': 'Not in inventory',
+}
+
+
+def normalize_drug_name(name):
+    # "Tab. Metformin HCl 500 mg SR" -> "metformin"; "Vitamin B 12" ->
+    # "vitamin b12". Letters and digits that name the drug are kept, bare
+    # numbers left after the strength are dropped.
+    text = re.sub(r'\b([a-z])[\s-]+(\d+)\b', r'\1\2', STRENGTH.sub(' ', name.lower()))
+    words = re.findall(r'[a-z0-9]+', text)
+    words = [word for word in words if word not in DOSE_FORMS and not word.isdigit()]
+    while len(words) > 1 and words[-1] in SALTS:
+        words.pop()
+    return ' '.join(words)
+
+
+def _suffixes(name):
+    # Parts of a normalized name that tell otherwise alike drugs apart: the
+    # "b12" of "vitamin b12", the "k" of "vitamin k"
+    return {word for word in name.split() if len(word) == 1 or any(char.isdigit() for char in word)}
+
+
+def _expiry(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+class InventoryMatcher:
+    # Matches prescribed medicine names against a user's inventory rows
+    # locally. Each prescribed name gets a status: available (a matching row
+    # with stock that hasn't expired), expired, out_of_stock, or unmatched.
+    def __init__(self, threshold=MATCH_THRESHOLD):
+        self.threshold = threshold
+
+    def _status(self, rows, today):
+        usable = [row for row in rows if row['quantity'] > 0]
+        if not usable:
+            return 'out_of_stock'
+        if all(row['expires'] is not None and row['expires'] < today for row in usable):
+            return 'expired'
+        return 'available'
+
+    def _entry(self, medicine, rows, today):
+        return {
+            'medicine': medicine,
+            'status': self._status(rows, today) if rows else 'unmatched',
+            'matches': [{
+                'name': row['name'],
+                'quantity': row['quantity'],
+                'expiryDate': row['expires'].isoformat() if row['expires'] else None,
+                'score': row['score'],
+            } for row in rows],
+        }
+
+    def match(self, medicines, inventory, today=None):
+        today = today or date.today()
+        rows = [{'name': row['name'], 'quantity': row['quantity'] or 0,
+                 'expires': _expiry(row['expiryDate'])} for row in inventory]
+        choices = {index: normalize_drug_name(row['name']) for index, row in enumerate(rows)}
+
+        results = []
+        for medicine in medicines:
+            query = normalize_drug_name(medicine)
+            found = process.extract(query, choices, scorer=fuzz.token_sort_ratio,
+                                    score_cutoff=self.threshold, limit=None) if query else []
+            matched = [dict(rows[index], score=round(score, 1)) for choice, score, index in found
+                       if _suffixes(choice) == _suffixes(query)]
+            results.append(self._entry(medicine, matched, today))
+        return results
+
+    def resolve(self, result, inventory_name, inventory, today=None):
+        # Attach rows the caller matched some other way (e.g. brand to generic)
+        today = today or date.today()
+        rows = [{'name': row['name'], 'quantity': row['quantity'] or 0,
+                 'expires': _expiry(row['expiryDate']), 'score': None}
+                for row in inventory if row['name'] == inventory_name]
+        return self._entry(result['medicine'], rows, today) if rows else result
+
+
+def render_comparison(results):
+    # Same "Available:" / "Not Available:" sections the model comparison used
+    available = [result for result in results if result['status'] == 'available']
+    missing = [result for result in results if result['status'] != 'available']
+
+    lines = ["**Available:**"]
+    for result in available:
+        stock = ', '.join(f"{match['name']} (Quantity: {match['quantity']}, Expires: {match['expiryDate']})"
+                          for match in result['matches'])
+        lines.append(f"* {result['medicine']} - {stock}")
+    if not available:
+        lines.append("* None")
+    lines.append("")
+    lines.append("**Not Available:**")
+    for result in missing:
+        lines.append(f"* {result['medicine']} - {STATUS_LABELS[result['status']]}")
+    if not missing:
+        lines.append("* None")
+    return '\n'.join(lines)
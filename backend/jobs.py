@@ -0,0 +1,132 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, key=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        # (event, data) progress reports, in the order they were published
+        self.events = []
+        self._changed = threading.Condition()
+
+    def publish(self, event, data=None):
+        with self._changed:
+            self.events.append((event, data))
+            self._changed.notify_all()
+
+    def finish(self):
+        with self._changed:
+            self.finished_at = time.time()
+            self._changed.notify_all()
+
+    def wait(self, seen, timeout=None):
+        # Events after the first `seen`. While there are none and the job is
+        # still going, waits up to timeout for the next one.
+        with self._changed:
+            if len(self.events) <= seen and self.finished_at is None:
+                self._changed.wait(timeout)
+            return self.events[seen:]
+
+    def to_dict(self):
+        return {
+            'jobId': self.id,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'createdAt': self.created_at,
+            'finishedAt': self.finished_at,
+        }
+
+
+class JobQueue:
+    # Bounded background worker pool. At most max_workers jobs run at once and
+    # at most max_pending more wait; submit() refuses work beyond that instead
+    # of letting the backlog grow without limit. Finished jobs are kept for
+    # result_ttl seconds so callers can poll them.
+    def __init__(self, name, max_workers=4, max_pending=100, result_ttl=600):
+        self.name = name
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active_keys = {}
+        self._stats = {'submitted': 0, 'rejected': 0, 'deduplicated': 0,
+                       'succeeded': 0, 'failed': 0}
+
+    def submit(self, fn, *args, key=None, with_job=False, **kwargs):
+        # Jobs sharing a key (e.g. one medicine row) are collapsed while one is
+        # in flight. with_job passes the Job to fn first, to publish progress.
+        with self._lock:
+            self._prune()
+            if key is not None and key in self._active_keys:
+                self._stats['deduplicated'] += 1
+                return self._jobs[self._active_keys[key]]
+            if not self._slots.acquire(blocking=False):
+                self._stats['rejected'] += 1
+                raise QueueFullError(f"{self.name} queue is full")
+            job = Job(key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._active_keys[key] = job.id
+            self._stats['submitted'] += 1
+
+        if with_job:
+            args = (job,) + args
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = 'running'
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = 'done'
+        except Exception as e:
+            print(f"Job {job.id} in {self.name} failed: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finish()
+            with self._lock:
+                self._stats['succeeded' if job.status == 'done' else 'failed'] += 1
+                if job.key is not None and self._active_keys.get(job.key) == job.id:
+                    del self._active_keys[job.key]
+            self._slots.release()
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        # Expired jobs are dropped here too, not only when the next job is
+        # submitted, so they are never returned after result_ttl
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def find(self, key):
+        with self._lock:
+            job_id = self._active_keys.get(key)
+            return self._jobs.get(job_id) if job_id else None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queued'] = sum(1 for job in self._jobs.values() if job.status == 'queued')
+            stats['running'] = sum(1 for job in self._jobs.values() if job.status == 'running')
+        return stats
@@ -0,0 +1,195 @@
+import threading
+import time
+
+import google.generativeai as genai
+
+from llm_cache import ResponseCache, cache_key
+
+MODEL_NAME = "gemini-1.5-pro"
+
+SAFETY_SETTINGS = [
+    {
+        "category": "HARM_CATEGORY_HARASSMENT",
+        "threshold": "BLOCK_ONLY_HIGH"
+    },
+    {
+        "category": "HARM_CATEGORY_HATE_SPEECH",
+        "threshold": "BLOCK_ONLY_HIGH"
+    },
+    {
+        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "threshold": "BLOCK_ONLY_HIGH"
+    },
+    {
+        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+        "threshold": "BLOCK_ONLY_HIGH"
+    },
+]
+
+
+def _generation_config(temperature):
+    return {
+        "temperature": temperature,
+        "top_p": 1,
+        "top_k": 32,
+        "max_output_tokens": 4096,
+    }
+
+
+# Typed output of the single-call prescription extraction
+PRESCRIPTION_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'patient': {'type': 'STRING', 'nullable': True},
+        'date': {'type': 'STRING', 'nullable': True},
+        'medications': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'name': {'type': 'STRING'},
+                    'dosage': {'type': 'STRING', 'nullable': True},
+                    'frequency': {'type': 'STRING', 'nullable': True},
+                    'duration': {'type': 'STRING', 'nullable': True},
+                },
+                'required': ['name'],
+            },
+        },
+        'instructions': {'type': 'STRING', 'nullable': True},
+        'doctor': {'type': 'STRING', 'nullable': True},
+    },
+    'required': ['medications'],
+}
+
+
+# Every model configuration the app uses. "default" is the bare model with the
+# SDK's own generation defaults and safety settings. The high-temperature chat
+# profile opts out of response caching: repeated prompts should get fresh replies.
+PROFILES = {
+    'advisor': {'generation_config': _generation_config(0.7), 'safety_settings': SAFETY_SETTINGS,
+                'cacheable': False},
+    'prescription': {'generation_config': _generation_config(0.4), 'safety_settings': SAFETY_SETTINGS},
+    'image_analysis': {'generation_config': _generation_config(0.3), 'safety_settings': SAFETY_SETTINGS},
+    'prescription_structured': {
+        'generation_config': dict(_generation_config(0.4), response_mime_type='application/json',
+                                  response_schema=PRESCRIPTION_SCHEMA),
+        'safety_settings': SAFETY_SETTINGS,
+    },
+    # Short, factual rolling summaries of chat sessions
+    'memory': {'generation_config': dict(_generation_config(0.2), max_output_tokens=512),
+               'safety_settings': SAFETY_SETTINGS, 'cacheable': False},
+    'default': {},
+}
+
+
+class TimedModel:
+    # Wraps a shared GenerativeModel and records how long each call takes and
+    # how many tokens it used
+    def __init__(self, registry, profile, model):
+        self._registry = registry
+        self.profile = profile
+        self.model = model
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def generate_text(self, prompt, cache_site=None):
+        # Text-only call whose response is reused for identical prompts when the
+        # call site has a cache TTL
+        cache = self._registry.cache
+        settings = self._registry.settings(self.profile)
+        cacheable = (cache is not None and settings.get('cacheable', True)
+                     and cache.ttl_for(cache_site) is not None)
+        if cacheable:
+            key = cache_key(self._registry.model_name, settings, prompt)
+            text = cache.get(cache_site, key)
+            if text is not None:
+                return text
+
+        text = self.generate_content(prompt).text
+        if cacheable and text:
+            cache.put(cache_site, key, text)
+        return text
+
+    def generate_content(self, *args, **kwargs):
+        if kwargs.get('stream'):
+            return self._timed_stream(*args, **kwargs)
+        started = time.monotonic()
+        response = None
+        try:
+            response = self.model.generate_content(*args, **kwargs)
+            return response
+        finally:
+            usage = getattr(response, 'usage_metadata', None)
+            self._registry.record(self.profile, time.monotonic() - started, response is None, usage)
+
+    def _timed_stream(self, *args, **kwargs):
+        # A streamed call is timed until its last chunk has been read
+        started = time.monotonic()
+        failed = False
+        try:
+            yield from self.model.generate_content(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._registry.record(self.profile, time.monotonic() - started, failed)
+
+
+class LLMRegistry:
+    # Configures the Gemini SDK once and hands out one shared model per profile.
+    # genai.configure() mutates global client state, so it must not be called
+    # from request threads.
+    def __init__(self, api_key, profiles=PROFILES, model_name=MODEL_NAME, cache=None):
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.cache = cache if cache is not None else ResponseCache()
+        self._profiles = profiles
+        self._models = {}
+        self._lock = threading.Lock()
+        self._latency = {}
+
+    def model(self, profile='default'):
+        with self._lock:
+            model = self._models.get(profile)
+            if model is None:
+                settings = self._profiles[profile]
+                model = TimedModel(self, profile, genai.GenerativeModel(
+                    model_name=self.model_name,
+                    generation_config=settings.get('generation_config'),
+                    safety_settings=settings.get('safety_settings')
+                ))
+                self._models[profile] = model
+                self._latency[profile] = {'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                          'prompt_tokens': 0, 'output_tokens': 0}
+            return model
+
+    def settings(self, profile):
+        return self._profiles[profile]
+
+    def record(self, profile, seconds, failed=False, usage=None):
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            latency = self._latency[profile]
+            latency['calls'] += 1
+            latency['errors'] += int(failed)
+            latency['total_ms'] += elapsed_ms
+            latency['max_ms'] = max(latency['max_ms'], elapsed_ms)
+            if usage is not None:
+                latency['prompt_tokens'] += usage.prompt_token_count
+                latency['output_tokens'] += usage.candidates_token_count
+
+    def stats(self):
+        with self._lock:
+            stats = {}
+            for profile, latency in self._latency.items():
+                calls = latency['calls']
+                stats[profile] = {
+                    'calls': calls,
+                    'errors': latency['errors'],
+                    'avg_ms': round(latency['total_ms'] / calls, 1) if calls else 0.0,
+                    'max_ms': round(latency['max_ms'], 1),
+                    'prompt_tokens': latency['prompt_tokens'],
+                    'output_tokens': latency['output_tokens'],
+                }
+        return stats
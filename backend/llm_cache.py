@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from cachetools import LRUCache
+
+# Seconds a cached response stays valid, per call site. Call sites that are not
+# listed here (the chat endpoints) are never cached.
+CALL_SITE_TTLS = {
+    'ayurvedic': 7 * 24 * 3600,
+    'medicine_summary': 30 * 24 * 3600,
+    'inventory_compare': 3600,
+    'search_keywords': 24 * 3600,
+    'intent': 24 * 3600,
+}
+
+MEMORY_SIZE = int(os.getenv('LLM_CACHE_MEMORY_SIZE', '1000'))
+# Set to a file path to keep responses across restarts and share them between workers
+DISK_PATH = os.getenv('LLM_CACHE_PATH')
+
+
+def cache_key(model_name, settings, prompt):
+    payload = json.dumps({'model': model_name, 'settings': settings, 'prompt': prompt},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, ttls=None, maxsize=MEMORY_SIZE, disk_path=DISK_PATH):
+        self.ttls = dict(CALL_SITE_TTLS, **(ttls or {}))
+        self._memory = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, text TEXT, expires_at REAL)")
+            self._disk.commit()
+        self._stats = {}
+
+    def ttl_for(self, site):
+        return self.ttls.get(site)
+
+    def _bump(self, site, key):
+        counts = self._stats.setdefault(site, {'memory_hits': 0, 'disk_hits': 0, 'misses': 0})
+        counts[key] += 1
+
+    def get(self, site, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] > now:
+                self._bump(site, 'memory_hits')
+                return entry[0]
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT text, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] > now:
+                    self._memory[key] = row
+                    self._bump(site, 'disk_hits')
+                    return row[0]
+            self._bump(site, 'misses')
+            return None
+
+    def put(self, site, key, text):
+        expires_at = time.time() + self.ttls[site]
+        with self._lock:
+            self._memory[key] = (text, expires_at)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO responses (key, text, expires_at) VALUES (?, ?, ?)",
+                    (key, text, expires_at))
+                self._disk.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = {site: dict(counts) for site, counts in self._stats.items()}
+            stats['memory_entries'] = len(self._memory)
+        return stats
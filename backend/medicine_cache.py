@@ -0,0 +1,128 @@
+import os
+import re
+import threading
+import time
+
+from cachetools import LRUCache
+from mysql.connector import Error
+
+# Each layer ages independently: scraped pages change more often than drug classes
+LAYER_TTLS = {
+    'drugs_com': int(os.getenv('KNOWLEDGE_TTL_DRUGS_COM', str(7 * 24 * 3600))),
+    'rxnav': int(os.getenv('KNOWLEDGE_TTL_RXNAV', str(30 * 24 * 3600))),
+    'summary': int(os.getenv('KNOWLEDGE_TTL_SUMMARY', str(30 * 24 * 3600))),
+}
+# Lookups that found nothing are remembered briefly so unknown names aren't re-fetched per user
+NEGATIVE_TTL = int(os.getenv('KNOWLEDGE_NEGATIVE_TTL', '3600'))
+MEMORY_SIZE = int(os.getenv('KNOWLEDGE_MEMORY_SIZE', '2000'))
+
+
+def normalize_medicine_name(name):
+    name = re.sub(r'[^a-z0-9+\-]+', ' ', name.lower())
+    return ' '.join(name.split())
+
+
+class MedicineKnowledgeCache:
+    # Two tiers: a per-process LRU in front of the shared medicine_knowledge
+    # table, so every worker and every user benefits from one fetch.
+    def __init__(self, pool=None, ttls=None, negative_ttl=NEGATIVE_TTL, maxsize=MEMORY_SIZE):
+        self._pool = pool
+        self.ttls = dict(LAYER_TTLS, **(ttls or {}))
+        self.negative_ttl = negative_ttl
+        self._memory = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._stats = {layer: {'memory_hits': 0, 'store_hits': 0, 'misses': 0, 'bypasses': 0}
+                       for layer in self.ttls}
+
+    def _bump(self, layer, key):
+        with self._lock:
+            self._stats[layer][key] += 1
+
+    def _read_store(self, layer, name_key):
+        if self._pool is None:
+            return None
+        try:
+            connection = self._pool.get_connection()
+        except Error as e:
+            print(f"Knowledge cache store unavailable: {e}")
+            return None
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT content, expires_at FROM medicine_knowledge WHERE name_key = %s AND layer = %s",
+                (name_key, layer)
+            )
+            return cursor.fetchone()
+        except Error as e:
+            print(f"Error reading knowledge cache: {e}")
+            return None
+        finally:
+            cursor.close()
+            connection.close()
+
+    def _write_store(self, layer, name_key, content, expires_at):
+        if self._pool is None:
+            return
+        try:
+            connection = self._pool.get_connection()
+        except Error as e:
+            print(f"Knowledge cache store unavailable: {e}")
+            return
+        cursor = connection.cursor()
+        try:
+            cursor.execute("""
+            INSERT INTO medicine_knowledge (name_key, layer, content, expires_at)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE content = VALUES(content), expires_at = VALUES(expires_at)
+            """, (name_key, layer, content, expires_at))
+            connection.commit()
+        except Error as e:
+            print(f"Error writing knowledge cache: {e}")
+        finally:
+            cursor.close()
+            connection.close()
+
+    def get(self, layer, name):
+        # Returns (found, value); a cached negative result is (True, None)
+        name_key = normalize_medicine_name(name)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get((layer, name_key))
+        if entry is not None and entry[1] > now:
+            self._bump(layer, 'memory_hits')
+            return True, entry[0]
+
+        row = self._read_store(layer, name_key)
+        if row is not None and row[1] > now:
+            with self._lock:
+                self._memory[(layer, name_key)] = (row[0], row[1])
+            self._bump(layer, 'store_hits')
+            return True, row[0]
+
+        self._bump(layer, 'misses')
+        return False, None
+
+    def put(self, layer, name, value):
+        name_key = normalize_medicine_name(name)
+        ttl = self.ttls[layer] if value is not None else self.negative_ttl
+        expires_at = int(time.time() + ttl)
+        with self._lock:
+            self._memory[(layer, name_key)] = (value, expires_at)
+        self._write_store(layer, name_key, value, expires_at)
+
+    def get_or_load(self, layer, name, loader, force=False):
+        if force:
+            self._bump(layer, 'bypasses')
+        else:
+            found, value = self.get(layer, name)
+            if found:
+                return value
+        value = loader(name)
+        self.put(layer, name, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            stats = {layer: dict(counts) for layer, counts in self._stats.items()}
+            stats['memory_entries'] = len(self._memory)
+        return stats
@@ -0,0 +1,260 @@
+import argparse
+import ast
+import os
+import re
+import sys
+
+import mysql.connector
+from mysql.connector import Error
+
+from db import db_config
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+
+def _create_core_tables(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id VARCHAR(255) NOT NULL PRIMARY KEY,
+        email VARCHAR(255) NOT NULL,
+        phone_number VARCHAR(15) NOT NULL,
+        password_hash VARCHAR(255) NOT NULL,
+        UNIQUE KEY uq_users_email (email),
+        UNIQUE KEY uq_users_phone_number (phone_number)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS medicines (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        quantity INT NOT NULL,
+        expiryDate DATE NOT NULL,
+        userId VARCHAR(255) NOT NULL,
+        userEmail VARCHAR(255) NOT NULL,
+        username VARCHAR(255) NOT NULL,
+        created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        description TEXT NULL
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS family_groups (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        created_by VARCHAR(255) NOT NULL,
+        created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS group_members (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        group_id INT NOT NULL,
+        user_id VARCHAR(255) NOT NULL,
+        joined_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (group_id) REFERENCES family_groups (id) ON DELETE CASCADE
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS group_invitations (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        group_id INT NOT NULL,
+        inviter_id VARCHAR(255) NOT NULL,
+        invitee_email VARCHAR(255) NOT NULL,
+        created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (group_id) REFERENCES family_groups (id) ON DELETE CASCADE
+    )
+    """)
+
+
+# (table, index name, columns, unique) for every filter the routes run
+ROUTE_INDEXES = [
+    # userId alone is served by the leftmost prefix of this index
+    ('medicines', 'idx_medicines_user_expiry', ('userId', 'expiryDate'), False),
+    ('group_members', 'idx_group_members_group_user', ('group_id', 'user_id'), False),
+    ('group_members', 'idx_group_members_user_group', ('user_id', 'group_id'), False),
+    ('group_invitations', 'idx_group_invitations_invitee', ('invitee_email',), False),
+    ('users', 'uq_users_email', ('email',), True),
+    ('users', 'uq_users_phone_number', ('phone_number',), True),
+]
+
+
+def _existing_indexes(cursor, table):
+    cursor.execute("""
+    SELECT index_name, column_name
+    FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = %s
+    ORDER BY index_name, seq_in_index
+    """, (table,))
+    indexes = {}
+    for index_name, column_name in cursor.fetchall():
+        indexes.setdefault(index_name, []).append(column_name)
+    return indexes
+
+
+def _create_index(cursor, table, name, columns, unique=False):
+    # Tables created before this module existed may already carry an
+    # equivalent index under another name; any index with the same leading
+    # columns serves the same lookups.
+    for existing in _existing_indexes(cursor, table).values():
+        if tuple(existing[:len(columns)]) == tuple(columns):
+            return False
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    cursor.execute(f"CREATE {kind} {name} ON {table} ({', '.join(columns)})")
+    return True
+
+
+def _add_route_indexes(cursor):
+    for table, name, columns, unique in ROUTE_INDEXES:
+        if _create_index(cursor, table, name, columns, unique):
+            print(f"Created index {name} on {table}")
+
+
+def _add_medicines_page_index(cursor):
+    # GET /medicines pages with userId = ? AND id > ? ORDER BY id
+    if _create_index(cursor, 'medicines', 'idx_medicines_user_id', ('userId', 'id')):
+        print("Created index idx_medicines_user_id on medicines")
+
+
+def _add_description_status(cursor):
+    # Rows written before background enrichment already carry their description
+    cursor.execute("""
+    SELECT COUNT(*) FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = 'medicines' AND column_name = 'description_status'
+    """)
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("ALTER TABLE medicines ADD COLUMN description_status VARCHAR(16) NOT NULL DEFAULT 'ready'")
+
+
+def _create_medicine_knowledge(cursor):
+    # content is NULL for remembered misses; expires_at is a unix timestamp
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS medicine_knowledge (
+        name_key VARCHAR(255) NOT NULL,
+        layer VARCHAR(16) NOT NULL,
+        content MEDIUMTEXT NULL,
+        expires_at BIGINT NOT NULL,
+        PRIMARY KEY (name_key, layer)
+    )
+    """)
+
+
+# Applied in order and recorded in schema_migrations; never edit a released entry
+MIGRATIONS = [
+    (1, 'create core tables', _create_core_tables),
+    (2, 'indexes for route queries', _add_route_indexes),
+    (3, 'keyset pagination index for medicines', _add_medicines_page_index),
+    (4, 'description enrichment status on medicines', _add_description_status),
+    (5, 'shared medicine knowledge cache', _create_medicine_knowledge),
+]
+
+
+def _ensure_migrations_table(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT NOT NULL PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+
+def applied_versions(connection):
+    cursor = connection.cursor()
+    try:
+        _ensure_migrations_table(cursor)
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def apply_migrations(connection):
+    done = applied_versions(connection)
+    applied = []
+    cursor = connection.cursor()
+    try:
+        for version, name, migrate in MIGRATIONS:
+            if version in done:
+                continue
+            print(f"Applying migration {version}: {name}")
+            migrate(cursor)
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                           (version, name))
+            connection.commit()
+            applied.append(version)
+    finally:
+        cursor.close()
+    return applied
+
+
+def route_queries(path=APP_PATH):
+    # Every literal SELECT/UPDATE/DELETE statement in app.py; {columns}
+    # templates are explained with every column selected
+    with open(path, encoding='utf-8') as file:
+        tree = ast.parse(file.read())
+    queries = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            sql = re.sub(r'\{\w+\}', '*', ' '.join(node.value.split()))
+            if sql.startswith(('SELECT ', 'UPDATE ', 'DELETE ')) and sql not in queries:
+                queries.append(sql)
+    return queries
+
+
+def check_query_plans(connection, queries=None):
+    # EXPLAIN each route query and report every table it reads with a full scan
+    problems = []
+    cursor = connection.cursor(dictionary=True)
+    try:
+        for sql in queries if queries is not None else route_queries():
+            # String placeholders keep index use on both VARCHAR and INT columns
+            explained = sql.replace('LIMIT %s', 'LIMIT 1')
+            params = ('0',) * explained.count('%s')
+            cursor.execute(f"EXPLAIN {explained}", params)
+            for row in cursor.fetchall():
+                table = row.get('table') or ''
+                if row.get('type') == 'ALL' and not table.startswith('<'):
+                    problems.append({
+                        'query': sql,
+                        'table': table,
+                        'possible_keys': row.get('possible_keys'),
+                    })
+    finally:
+        cursor.close()
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the MySQL schema for the backend.')
+    parser.add_argument('command', choices=['upgrade', 'status', 'check-plans'])
+    args = parser.parse_args(argv)
+
+    try:
+        connection = mysql.connector.connect(**db_config)
+    except Error as e:
+        print(f"Error connecting to MySQL: {e}")
+        return 2
+
+    try:
+        if args.command == 'upgrade':
+            applied = apply_migrations(connection)
+            print(f"Applied {len(applied)} migration(s)" if applied else "Schema is up to date")
+        elif args.command == 'status':
+            done = applied_versions(connection)
+            for version, name, _ in MIGRATIONS:
+                print(f"{version:>4}  {'applied' if version in done else 'pending':<8} {name}")
+        else:
+            problems = check_query_plans(connection)
+            for problem in problems:
+                print(f"Full table scan on {problem['table']} "
+                      f"(possible keys: {problem['possible_keys']}): {problem['query']}")
+            if problems:
+                return 1
+            print("All route queries use an index")
+        return 0
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
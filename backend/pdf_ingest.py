@@ -0,0 +1,141 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+BACKENDS = ('pypdf2', 'pdfminer', 'pypdfium2')
+PDF_BACKEND = os.getenv('PDF_TEXT_BACKEND', 'pypdf2')
+# Processes extracting pages of one document; 1 extracts in the calling process
+PDF_WORKERS = int(os.getenv('PDF_TEXT_WORKERS', '1'))
+
+# The document opened by this worker process, as (backend, document)
+_worker_document = None
+# PDFium is not thread-safe: calls into it from different threads take turns
+_pdfium_lock = threading.Lock()
+
+
+def _open(backend, path):
+    # Returns the per-backend document handle _page_text() reads pages from
+    if backend == 'pypdf2':
+        import PyPDF2
+        return PyPDF2.PdfReader(path)
+    if backend == 'pdfminer':
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfparser import PDFParser
+        # pdfminer reads objects lazily, so it parses an in-memory copy rather
+        # than a file that would have to stay open with the document
+        with open(path, 'rb') as file:
+            data = io.BytesIO(file.read())
+        return list(PDFPage.create_pages(PDFDocument(PDFParser(data))))
+    if backend == 'pypdfium2':
+        import pypdfium2
+        return pypdfium2.PdfDocument(path)
+    raise ValueError(f"Unknown PDF backend {backend!r}, expected one of: {', '.join(BACKENDS)}")
+
+
+def _page_count(backend, document):
+    return len(document.pages) if backend == 'pypdf2' else len(document)
+
+
+def _page_text(backend, document, index):
+    if backend == 'pypdf2':
+        return document.pages[index].extract_text()
+    if backend == 'pdfminer':
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        output = io.StringIO()
+        manager = PDFResourceManager()
+        device = TextConverter(manager, output, laparams=LAParams())
+        PDFPageInterpreter(manager, device).process_page(document[index])
+        device.close()
+        return output.getvalue()
+    page = document[index]
+    textpage = page.get_textpage()
+    try:
+        return textpage.get_text_range()
+    finally:
+        textpage.close()
+        page.close()
+
+
+def _init_worker(backend, path):
+    global _worker_document
+    _worker_document = (backend, _open(backend, path))
+
+
+def _extract_page(index):
+    backend, document = _worker_document
+    return _page_text(backend, document, index)
+
+
+def iter_page_texts(path, backend=PDF_BACKEND, workers=PDF_WORKERS):
+    # Yields the text of each page in order. With workers > 1 the pages are
+    # extracted by a process pool, each process opening the document once,
+    # and a page is yielded as soon as it and the pages before it are done,
+    # so callers can consume the document while the rest is still extracted.
+    # The processes are always spawned, never forked from a threaded server;
+    # spawned processes import the main module again, so a pool must not be
+    # started while a module is being imported.
+    # In this process PDFium takes turns with PdfPages renders
+    lock = _pdfium_lock if backend == 'pypdfium2' else contextlib.nullcontext()
+    with lock:
+        document = _open(backend, path)
+        count = _page_count(backend, document)
+    try:
+        if workers <= 1 or count < 2:
+            for index in range(count):
+                with lock:
+                    text = _page_text(backend, document, index)
+                yield text
+            return
+    finally:
+        if backend == 'pypdfium2':
+            with lock:
+                document.close()
+        del document
+
+    with ProcessPoolExecutor(max_workers=min(workers, count), mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(backend, path)) as executor:
+        yield from executor.map(_extract_page, range(count))
+
+
+class PdfPages:
+    # A PDF whose pages are rendered to images, e.g. a scanned prescription.
+    # data is the file's bytes.
+    def __init__(self, data):
+        import pypdfium2
+        with _pdfium_lock:
+            self._document = pypdfium2.PdfDocument(data)
+            self._count = len(self._document)
+        self._closed = False
+
+    def __len__(self):
+        return self._count
+
+    def render(self, max_dimension, grayscale=False):
+        # Yields each page as a PIL image whose longer side is max_dimension
+        # pixels, then closes the document. Stops early once it is closed.
+        try:
+            for index in range(self._count):
+                with _pdfium_lock:
+                    if self._closed:
+                        return
+                    page = self._document[index]
+                    try:
+                        scale = max_dimension / max(page.get_size())
+                        image = page.render(scale=scale, grayscale=grayscale).to_pil()
+                    finally:
+                        page.close()
+                yield image
+        finally:
+            self.close()
+
+    def close(self):
+        with _pdfium_lock:
+            if not self._closed:
+                self._closed = True
+                self._document.close()
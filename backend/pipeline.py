@@ -0,0 +1,92 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Shared by every pipeline run in the process
+pipeline_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='pipeline')
+
+
+class PipelineTimeout(Exception):
+    def __init__(self, pending, timings):
+        super().__init__(f"Pipeline deadline exceeded while waiting for: {', '.join(sorted(pending))}")
+        self.pending = pending
+        self.timings = timings
+
+
+class StageError(Exception):
+    def __init__(self, stage, error, timings):
+        super().__init__(f"Stage {stage} failed: {error}")
+        self.stage = stage
+        self.error = error
+        self.timings = timings
+
+
+class Pipeline:
+    # Runs named stages as soon as the stages they depend on have finished, so
+    # independent stages overlap. Each stage function receives a dict with the
+    # results of its dependencies. run() returns (results, timings in ms) or
+    # raises PipelineTimeout/StageError; stages still running past the
+    # deadline are left to finish in the background. on_stage, if given, is
+    # called with (name, result, ms) as each stage succeeds.
+    def __init__(self, deadline=None, executor=pipeline_executor):
+        self.deadline = deadline
+        self.executor = executor
+        self._stages = {}
+
+    def add(self, name, fn, deps=()):
+        self._stages[name] = (fn, tuple(deps))
+        return self
+
+    def _start(self, name, results):
+        fn, deps = self._stages[name]
+        inputs = {dep: results[dep] for dep in deps}
+        timing = {}
+
+        def run():
+            timing['started'] = time.monotonic()
+            try:
+                return fn(inputs)
+            finally:
+                timing['finished'] = time.monotonic()
+
+        return self.executor.submit(run), timing
+
+    def run(self, on_stage=None):
+        started = time.monotonic()
+        expires = started + self.deadline if self.deadline else None
+        results = {}
+        timings = {}
+        running = {}
+        waiting = dict(self._stages)
+
+        while waiting or running:
+            for name, (_, deps) in list(waiting.items()):
+                if all(dep in results for dep in deps):
+                    del waiting[name]
+                    future, timing = self._start(name, results)
+                    running[future] = (name, timing)
+
+            if not running:
+                raise ValueError(f"Unsatisfiable stage dependencies: {', '.join(sorted(waiting))}")
+
+            timeout = None if expires is None else max(expires - time.monotonic(), 0)
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                raise PipelineTimeout({name for name, _ in running.values()} | set(waiting), timings)
+
+            for future in done:
+                name, timing = running.pop(future)
+                timings[name] = round((timing['finished'] - timing['started']) * 1000, 1)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    raise StageError(name, e, timings)
+                if on_stage is not None:
+                    on_stage(name, results[name], timings[name])
+
+        timings['total'] = round((time.monotonic() - started) * 1000, 1)
+        return results, timings
+
+
+def server_timing(timings):
+    # Render stage timings as a Server-Timing header value
+    return ', '.join(f"{name};dur={duration}" for name, duration in timings.items())
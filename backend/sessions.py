@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+SESSION_TTL = int(os.getenv('CHAT_SESSION_TTL', '1800'))
+MAX_SESSIONS = int(os.getenv('CHAT_SESSION_MAX', '1000'))
+# Rough cap on the text held by all sessions of one worker
+MAX_SESSION_BYTES = int(os.getenv('CHAT_SESSION_MAX_BYTES', str(50 * 1024 * 1024)))
+
+# Conversation memory: the last RECENT_TURNS turns stay verbatim, older ones are
+# folded into a running summary once SUMMARIZE_EVERY of them have piled up, and
+# the history put in a prompt never exceeds TOKEN_BUDGET (estimated) tokens
+RECENT_TURNS = int(os.getenv('CHAT_MEMORY_RECENT_TURNS', '6'))
+SUMMARIZE_EVERY = int(os.getenv('CHAT_MEMORY_SUMMARIZE_EVERY', '6'))
+TOKEN_BUDGET = int(os.getenv('CHAT_MEMORY_TOKEN_BUDGET', '2000'))
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+
+def format_turns(turns):
+    # Same "sender: text" lines the frontend used to send as conversation_history
+    return '\n'.join(f"{role}: {text}" for role, text in turns)
+
+
+class ChatSession:
+    def __init__(self, session_id=None):
+        self.id = session_id or uuid.uuid4().hex
+        self.turns = []
+        # Running summary of the turns that were folded out of self.turns
+        self.summary = ''
+        self.last_used = time.monotonic()
+        self.size = 0
+        # Turns of one conversation are answered one at a time
+        self.lock = threading.Lock()
+
+    def add_turn(self, role, text):
+        self.turns.append((role, text))
+        self.size += len(text.encode('utf-8'))
+
+    def set_memory(self, summary, turns):
+        self.summary = summary
+        self.turns = list(turns)
+        self.size = len(summary.encode('utf-8')) + sum(len(text.encode('utf-8')) for _, text in self.turns)
+
+    def transcript(self):
+        return format_turns(self.turns)
+
+    def contents(self):
+        # History in the shape GenerativeModel.start_chat() expects
+        contents = []
+        if self.summary:
+            contents.append({'role': 'user', 'parts': [f"Summary of our earlier conversation: {self.summary}"]})
+            contents.append({'role': 'model', 'parts': ["Understood."]})
+        contents.extend({'role': 'user' if role == 'user' else 'model', 'parts': [text]}
+                        for role, text in self.turns)
+        return contents
+
+
+class ConversationMemory:
+    # Bounds the history sent with each turn. summarize(summary, transcript)
+    # returns the updated running summary; it is only called every
+    # summarize_every turns, or early when the token budget is exceeded.
+    def __init__(self, summarize, recent_turns=RECENT_TURNS, summarize_every=SUMMARIZE_EVERY,
+                 token_budget=TOKEN_BUDGET):
+        self.summarize = summarize
+        self.recent_turns = recent_turns
+        self.summarize_every = summarize_every
+        self.token_budget = token_budget
+        self._lock = threading.Lock()
+        self._stats = {'summaries': 0, 'summary_failures': 0, 'clipped': 0}
+
+    def context(self, session):
+        parts = []
+        if session.summary:
+            parts.append(f"Summary of earlier conversation: {session.summary}")
+        if session.turns:
+            parts.append(session.transcript())
+        return '\n'.join(parts)
+
+    def compact(self, session):
+        # Call with session.lock held, after the latest turns were added
+        overflow = len(session.turns) - self.recent_turns
+        over_budget = estimate_tokens(self.context(session)) > self.token_budget
+        if overflow >= self.summarize_every or (overflow > 0 and over_budget):
+            self._fold(session, overflow)
+        if estimate_tokens(self.context(session)) > self.token_budget:
+            self._clip(session)
+
+    def _fold(self, session, count):
+        folded = format_turns(session.turns[:count])
+        try:
+            summary = self.summarize(session.summary, folded)
+            self._bump('summaries')
+        except Exception as e:
+            print(f"Error summarizing conversation: {e}")
+            summary = None
+            self._bump('summary_failures')
+        if not summary:
+            # Without a model summary keep the raw text; _clip bounds it
+            summary = f"{session.summary}\n{folded}".strip()
+        session.set_memory(summary.strip(), session.turns[count:])
+
+    def _clip(self, session):
+        # Hard cap: the summary gets at most half the budget (keeping its most
+        # recent part), then the oldest verbatim turns are shortened
+        self._bump('clipped')
+        budget_chars = self.token_budget * CHARS_PER_TOKEN
+        summary = session.summary
+        if len(summary) > budget_chars // 2:
+            summary = summary[-(budget_chars // 2):]
+        turns = list(session.turns)
+        remaining = budget_chars - len(summary) - 64
+        for index in range(len(turns)):
+            used = sum(len(text) + len(role) + 3 for role, text in turns)
+            if used <= remaining:
+                break
+            role, text = turns[index]
+            excess = used - remaining
+            turns[index] = (role, text[:max(len(text) - excess, 0)])
+        session.set_memory(summary, [(role, text) for role, text in turns if text])
+
+    def _bump(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+class ChatSessionStore:
+    # Per-process LRU of chat sessions. Sessions expire after ttl seconds of
+    # inactivity, and the least recently used ones are dropped whenever the
+    # session count or the total text size exceeds its cap.
+    def __init__(self, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS, max_bytes=MAX_SESSION_BYTES):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'created': 0, 'expired': 0, 'evicted': 0}
+
+    def get_or_create(self, session_id=None):
+        # Returns (session, created). Unknown or expired ids get a fresh session.
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None and now - session.last_used > self.ttl:
+                del self._sessions[session_id]
+                self._stats['expired'] += 1
+                session = None
+            created = session is None
+            if created:
+                session = ChatSession()
+                self._sessions[session.id] = session
+                self._stats['created'] += 1
+            session.last_used = now
+            self._sessions.move_to_end(session.id)
+            self._evict(now)
+        return session, created
+
+    def touch(self, session):
+        # Call after a turn so the new text counts against the memory cap
+        with self._lock:
+            session.last_used = time.monotonic()
+            if session.id in self._sessions:
+                self._sessions.move_to_end(session.id)
+            self._evict(session.last_used)
+
+    def _evict(self, now):
+        for session_id, session in list(self._sessions.items()):
+            if now - session.last_used <= self.ttl:
+                break
+            del self._sessions[session_id]
+            self._stats['expired'] += 1
+
+        total = sum(session.size for session in self._sessions.values())
+        while self._sessions and (len(self._sessions) > self.max_sessions or total > self.max_bytes):
+            session_id, session = self._sessions.popitem(last=False)
+            total -= session.size
+            self._stats['evicted'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['active'] = len(self._sessions)
+            stats['bytes'] = sum(session.size for session in self._sessions.values())
+        return stats
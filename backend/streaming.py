@@ -0,0 +1,63 @@
+import json
+import re
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+CITATION = re.compile(r'\[Source: (.*?) \((https?://\S+)\)\]')
+
+
+def format_citation(sentence):
+    # Turn "[Source: Title (https://...)]" into a link
+    match = CITATION.search(sentence)
+    if match:
+        title, link = match.groups()
+        formatted_citation = f'[<a href="{link}" target="_blank">{title}</a>]'
+        sentence = re.sub(r'\[Source: .*?\]', formatted_citation, sentence)
+    return sentence
+
+
+class SentenceBuffer:
+    # Collects streamed model text and releases it one finished sentence at a
+    # time, so per-sentence formatting sees the same input it would for the
+    # complete response. Joining everything feed() and flush() return gives
+    # the same text as splitting, formatting and ' '.join()-ing the whole reply.
+    def __init__(self, format_sentence=format_citation):
+        self.format_sentence = format_sentence
+        self._pending = ''
+        self._started = False
+
+    def _emit(self, sentences):
+        out = []
+        for sentence in sentences:
+            text = self.format_sentence(sentence)
+            out.append(' ' + text if self._started else text)
+            self._started = True
+        return out
+
+    def feed(self, text):
+        if self._started and not self._pending:
+            # Whitespace after a released sentence belongs to that boundary
+            text = text.lstrip()
+        parts = SENTENCE_BOUNDARY.split(self._pending + text)
+        # The last part may still be growing
+        self._pending = parts.pop()
+        return self._emit(parts)
+
+    def flush(self):
+        rest, self._pending = self._pending, ''
+        return self._emit([rest]) if rest else []
+
+
+def stream_sentences(model, prompt, format_sentence=format_citation):
+    # Stream a Gemini reply, yielding formatted text one sentence at a time
+    buffer = SentenceBuffer(format_sentence)
+    for chunk in model.generate_content(prompt, stream=True):
+        yield from buffer.feed(chunk.text)
+    yield from buffer.flush()
+
+
+def sse_event(data, event=None):
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return '\n'.join(lines) + '\n\n'
@@ -0,0 +1,45 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from banned_drugs import BannedDrugChecker, parse_banned_list  # noqa: E402
+
+# Entries as text extraction returns them from banned_drugs.pdf
+COMBINATIONS = """
+1.   Aceclofenac  (SR) + Paracetamol  S.O. 750 (E)
+2.   Fixed Dose Combinations Of Ofloxacin + Ornidazole Injection  S.O. 850 (E)
+3.   Nimesulide + Phenylephrine  S.O. 760 (E)
+"""
+
+
+def combination_warnings(text):
+    checker = BannedDrugChecker(parse_banned_list(COMBINATIONS))
+    return {tuple(warning['ingredients']): warning for warning in checker.check(text)
+            if warning['type'] == 'banned_combination'}
+
+
+def test_combinations_limited_to_a_form_are_conditional():
+    warnings = combination_warnings('Tab Ofloxacin 200 mg + Ornidazole 500 mg, Aceclofenac 100 mg + Paracetamol')
+    assert warnings[('ofloxacin', 'ornidazole')]['conditional']
+    assert 'Injection' in warnings[('ofloxacin', 'ornidazole')]['message']
+    assert warnings[('aceclofenac', 'paracetamol')]['conditional']
+    assert '(SR)' in warnings[('aceclofenac', 'paracetamol')]['message']
+
+
+def test_combinations_without_a_form_are_not_conditional():
+    warnings = combination_warnings('Nimesulide + Phenylephrine')
+    assert not warnings[('nimesulide', 'phenylephrine')]['conditional']
+
+
+def test_split_words_do_not_make_a_ban_conditional():
+    # Both lines as text extraction returns them, with "its" and "and" broken apart
+    entries = parse_banned_list("""
+1.  Valdecoxib  and it s formulations  GSR NO. 510(E) Dated 28.07.2005
+2.  Phenypropanolamine a nd its formulations for human use. * GSR NO. 82(E) Dated 10.02.2011
+3.  Diclofenac and its formulations (for animal use)  GSR NO. 349(E)
+""")
+    assert {entry['name']: entry['conditional'] for entry in entries} == {
+        'Valdecoxib': False, 'Phenypropanolamine': False, 'Diclofenac': True}
+    warnings = BannedDrugChecker(entries).check('Tab Valdecoxib 10 mg, Phenypropanolamine 25 mg')
+    assert [warning['conditional'] for warning in warnings] == [False, False]
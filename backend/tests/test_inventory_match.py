@@ -0,0 +1,40 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from inventory_match import InventoryMatcher, normalize_drug_name  # noqa: E402
+
+
+def inventory(*names):
+    return [{'name': name, 'quantity': 5, 'expiryDate': '2099-01-01'} for name in names]
+
+
+def statuses(medicines, stock):
+    return {result['medicine']: result['status'] for result in InventoryMatcher().match(medicines, stock)}
+
+
+def test_normalize_keeps_letters_and_numbers_of_the_name():
+    assert normalize_drug_name('Tab. Metformin HCl 500 mg SR') == 'metformin'
+    assert normalize_drug_name('Vitamin B12') == 'vitamin b12'
+    assert normalize_drug_name('Vitamin B 12') == 'vitamin b12'
+    assert normalize_drug_name('Vitamin B6') != normalize_drug_name('Vitamin B12')
+
+
+def test_vitamins_with_different_numbers_do_not_match():
+    assert statuses(['Vitamin B6', 'Vitamin D3'], inventory('Vitamin B12')) == {
+        'Vitamin B6': 'unmatched', 'Vitamin D3': 'unmatched'}
+
+
+def test_similar_drug_names_do_not_match():
+    assert statuses(['Prednisone'], inventory('Prednisolone 5mg')) == {'Prednisone': 'unmatched'}
+
+
+def test_same_name_matches_whatever_the_strength_and_form():
+    assert statuses(['Tab Metformin HCl 500 mg', 'Vitamin B 12'], inventory('Metformin 500mg', 'Vitamin B12')) == {
+        'Tab Metformin HCl 500 mg': 'available', 'Vitamin B 12': 'available'}
+
+
+def test_lower_threshold_still_requires_the_same_suffixes():
+    results = InventoryMatcher(threshold=80).match(['Vitamin B6'], inventory('Vitamin B12'))
+    assert results[0]['status'] == 'unmatched'
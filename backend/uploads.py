@@ -0,0 +1,135 @@
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+from flask import Request
+from PIL import Image
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; memory is then not tracked
+    resource = None
+
+# Largest request body accepted; bigger uploads are answered with 413
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(16 * 1024 * 1024)))
+# Uploaded files are kept in memory up to this size and spooled to a temp file beyond it
+SPOOL_THRESHOLD = int(os.getenv('UPLOAD_SPOOL_THRESHOLD', str(512 * 1024)))
+# Images with more pixels are refused before they are decoded
+MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', str(40 * 1000 * 1000)))
+
+# PIL itself warns above this and refuses twice as many pixels, for any
+# image opened in the process
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class SpooledRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=SPOOL_THRESHOLD, mode='rb+')
+
+
+class ImageUpload:
+    # An uploaded image file, hashed while it is read once and decoded only
+    # after its dimensions have been checked
+    def __init__(self, file):
+        self.file = getattr(file, 'stream', file)
+        self.file.seek(0)
+        digest = hashlib.sha256()
+        self.size = 0
+        for chunk in iter(lambda: self.file.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            self.size += len(chunk)
+            if self.size > MAX_UPLOAD_BYTES:
+                raise UploadError(f"Image is larger than {MAX_UPLOAD_BYTES} bytes", 413)
+        self.digest = digest.hexdigest()
+        # Whether open() decoded a reduced-size version of the image
+        self.reduced = False
+
+    def read(self):
+        self.file.seek(0)
+        return self.file.read()
+
+    def detach(self):
+        # The request's files are closed when it ends; a copy outlives it for
+        # work that continues in the background
+        copy = tempfile.SpooledTemporaryFile(max_size=SPOOL_THRESHOLD, mode='rb+')
+        self.file.seek(0)
+        shutil.copyfileobj(self.file, copy, CHUNK_SIZE)
+        self.file = copy
+
+    def open(self, max_dimension=None, mode=None):
+        # Reads the header, refuses oversized images, then decodes. A JPEG that
+        # is only needed with its longer side at max_dimension is decoded at the
+        # smallest DCT scale (1/2, 1/4 or 1/8) that still covers that size,
+        # optionally straight to mode.
+        self.file.seek(0)
+        try:
+            image = Image.open(self.file)
+        except Image.DecompressionBombError as e:
+            raise UploadError(str(e), 413)
+        except Exception as e:
+            raise UploadError("Unable to open image file") from e
+
+        if image.width * image.height > MAX_IMAGE_PIXELS:
+            raise UploadError(f"Image has more than {MAX_IMAGE_PIXELS} pixels", 413)
+
+        if max_dimension and image.format == 'JPEG' and max(image.size) > max_dimension:
+            size = image.size
+            # draft() keeps both sides at least as large as asked, so it gets
+            # the target size, not a max_dimension square a 4:3 photo never fits
+            scale = max_dimension / max(size)
+            image.draft(mode, (max(1, round(size[0] * scale)), max(1, round(size[1] * scale))))
+            self.reduced = image.size != size
+
+        try:
+            image.load()
+        except Exception as e:
+            raise UploadError("Unable to decode image file") from e
+        return image
+
+
+def _peak_rss_kb():
+    # Linux reports ru_maxrss in KiB, macOS in bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class MemoryTracker:
+    # Peak resident set size around requests. The kernel only keeps the
+    # process's high-water mark, so each request is charged with how far it
+    # raised that mark: 0 when an earlier request already went as high.
+    # Concurrent requests in one worker share whatever growth they cause.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def start(self):
+        return _peak_rss_kb() if resource is not None else None
+
+    def record(self, endpoint, started):
+        if started is None:
+            return
+        peak = _peak_rss_kb()
+        growth = max(peak - started, 0)
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {'requests': 0, 'peak_rss_kb': 0,
+                                                      'max_growth_kb': 0, 'total_growth_kb': 0})
+            stats['requests'] += 1
+            stats['peak_rss_kb'] = max(stats['peak_rss_kb'], peak)
+            stats['max_growth_kb'] = max(stats['max_growth_kb'], growth)
+            stats['total_growth_kb'] += growth
+
+    def stats(self):
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._stats.items()}
@@ -1,12 +1,14 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Send, ImagePlus, MessageCircle, X } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
+import { useUser } from "@clerk/clerk-react";
 import HeroSection from './components/HeroSection';
 import FeatureSection from './components/FeatureSection';
 
 import '../src/styles/App.css';
 
 const App = () => {
+  const { user } = useUser();
   const [messages, setMessages] = useState([]);
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
@@ -48,6 +50,8 @@ const App = () => {
     const formData = new FormData();
     formData.append('image', file);
     formData.append('caption', caption);
+    // Lets the server reuse this user's earlier analysis of the same image
+    if (user) formData.append('userId', user.id);
 
     try {
       const response = await fetch('http://localhost:5050/analyze-health-image', {
@@ -10,6 +10,8 @@ const AITherapist = () => {
   const [isListening, setIsListening] = useState(false);
   const [isSpeaking, setIsSpeaking] = useState(false);
   const recognition = useRef(null);
+  // The backend keeps the transcript; we only send the session id and the new message
+  const sessionId = useRef(null);
   const synthesis = window.speechSynthesis;
 
   useEffect(() => {
@@ -65,8 +67,9 @@ const AITherapist = () => {
     try {
       const response = await axios.post('http://localhost:5050/mental_chat', { 
         message: input,
-        conversation_history: messages.map(m => `${m.sender}: ${m.text}`).join('\n')
+        session_id: sessionId.current
       });
+      sessionId.current = response.data.session_id;
       const botMessage = { text: response.data.response, sender: 'bot' };
       setMessages(prev => [...prev, botMessage]);
       speak(botMessage.text);
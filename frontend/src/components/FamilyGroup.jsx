@@ -70,10 +70,17 @@ function FamilyGroup() {
   const fetchGroupInventory = async (groupId) => {
     setLoading(true);
     try {
-      const response = await axios.get('http://localhost:5050/group-inventory', {
-        params: { groupId }
-      });
-      setGroupInventory(response.data);
+      // Follow X-Next-Cursor until every page has been loaded
+      const allMedicines = [];
+      let cursor;
+      do {
+        const response = await axios.get('http://localhost:5050/group-inventory', {
+          params: { groupId, cursor }
+        });
+        allMedicines.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+      } while (cursor);
+      setGroupInventory(allMedicines);
     } catch (err) {
       console.error('Failed to fetch group inventory:', err);
       setError('Failed to fetch group inventory. Please try again later.');
@@ -4,12 +4,21 @@ import { useUser } from "@clerk/clerk-react";
 import ReactMarkdown from 'react-markdown';
 import '../styles/ImageUpload.css';
 
+const API_URL = 'http://localhost:5050';
+// Shown while an interpretation job runs, by the last stage it finished
+const PROGRESS_LABELS = {
+  queued: 'Uploading...',
+  ocr_done: 'Interpreting...',
+  interpreted: 'Checking your inventory...',
+};
+
 function ImageUpload() {
   const [file, setFile] = useState(null);
   const [result, setResult] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [warnings, setWarnings] = useState([]);
+  const [progress, setProgress] = useState(null);
   const [ayurvedicAlternatives, setAyurvedicAlternatives] = useState(null);
   const { user } = useUser();
 
@@ -38,6 +47,7 @@ function ImageUpload() {
     setError(null);
     setWarnings([]);
     setAyurvedicAlternatives(null);
+    setProgress('queued');
 
     const formData = new FormData();
     formData.append('image', file);
@@ -46,36 +56,61 @@ function ImageUpload() {
     formData.append('username', user.fullName);
 
     try {
-        console.log('Sending request to interpret prescription...');
-        const response = await axios.post('http://localhost:5050/interpret', formData, {
+        console.log('Submitting prescription for interpretation...');
+        // The server answers at once with a job; its stages arrive as events
+        const response = await axios.post(`${API_URL}/interpret?async=1`, formData, {
             headers: { 
                 'Content-Type': 'multipart/form-data'
             },
-            timeout: 120000 // 120 seconds timeout
+            timeout: 30000
         });
-
-        console.log('Received response:', response.data);
-
-        if (response.data.error) {
-            setError(response.data.error);
-        } else if (response.data.prescription_interpretation) {
-            const prescriptionText = response.data.prescription_interpretation.interpretation || response.data.prescription_interpretation;
-            setResult({
-                prescription: formatPrescription(prescriptionText),
-                comparison: formatInventoryComparison(response.data.inventory_comparison || '')
-            });
-        } else {
-            setError('Unable to interpret the prescription. Please try again with a clearer image.');
-        }
+        await followInterpretation(response.data.eventsUrl);
     } catch (error) {
         console.error('Error:', error);
         const errorMessage = error.response?.data?.error || 'Failed to process the prescription. Please try again.';
         setError(errorMessage);
     } finally {
         setLoading(false);
+        setProgress(null);
     }
   };
 
+  const followInterpretation = (eventsUrl) => new Promise((resolve) => {
+    const source = new EventSource(`${API_URL}${eventsUrl}`);
+    const finish = () => {
+      source.close();
+      resolve();
+    };
+
+    source.addEventListener('ocr_done', () => setProgress('ocr_done'));
+    source.addEventListener('interpreted', (event) => {
+      const interpretation = JSON.parse(event.data).prescription_interpretation;
+      setResult((previous) => ({
+        ...previous,
+        prescription: formatPrescription(interpretation.interpretation || interpretation)
+      }));
+      setWarnings((interpretation.warnings || []).map((warning) => warning.message));
+      setProgress('interpreted');
+    });
+    source.addEventListener('compared', (event) => {
+      const comparison = JSON.parse(event.data).inventory_comparison;
+      setResult((previous) => ({
+        ...previous,
+        comparison: formatInventoryComparison(comparison || '')
+      }));
+    });
+    source.addEventListener('done', (event) => {
+      console.log('Interpretation finished:', JSON.parse(event.data));
+      finish();
+    });
+    // Sent by the server when the job fails, and by the browser when the stream drops
+    source.addEventListener('error', (event) => {
+      const message = event.data ? JSON.parse(event.data).error : null;
+      setError(message || 'Lost connection while interpreting the prescription. Please try again.');
+      finish();
+    });
+  });
+
   const fetchAyurvedicAlternatives = async () => {
     if (!result || !result.prescription) return;
 
@@ -151,7 +186,7 @@ function ImageUpload() {
           </label>
           <input id="file-upload" type="file" onChange={handleFileChange} accept="image/*" />
           <button type="submit" disabled={!file || loading || !user} className="submit-button">
-            {loading ? 'Processing...' : 'Interpret Prescription'}
+            {loading ? (PROGRESS_LABELS[progress] || 'Processing...') : 'Interpret Prescription'}
           </button>
         </form>
         <div className="drop-area">
@@ -13,6 +13,8 @@ function MedicineInventory() {
   const [editingMedicine, setEditingMedicine] = useState(null);
   const [searchQuery, setSearchQuery] = useState('');
   const [searchResults, setSearchResults] = useState([]);
+  // Descriptions by medicine id, loaded when a row is first expanded
+  const [descriptions, setDescriptions] = useState({});
 
   useEffect(() => {
     if (user) {
@@ -24,10 +26,22 @@ function MedicineInventory() {
   const fetchMedicines = async () => {
     setLoading(true);
     try {
-      const response = await axios.get('http://localhost:5050/medicines', {
-        params: { userId: user.id }
-      });
-      setMedicines(response.data);
+      // Descriptions are left out of the list and loaded per row on demand;
+      // follow X-Next-Cursor until every page has been loaded
+      const allMedicines = [];
+      let cursor;
+      do {
+        const response = await axios.get('http://localhost:5050/medicines', {
+          params: {
+            userId: user.id,
+            fields: 'id,name,quantity,expiryDate,description_status',
+            cursor
+          }
+        });
+        allMedicines.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+      } while (cursor);
+      setMedicines(allMedicines);
     } catch (err) {
       console.error('Failed to fetch medicines:', err);
       setError('Failed to fetch medicines. Please try again later.');
@@ -36,6 +50,17 @@ function MedicineInventory() {
     }
   };
 
+  const loadDescription = async (id) => {
+    if (id in descriptions) return;
+    setDescriptions((previous) => ({ ...previous, [id]: previous[id] ?? null }));
+    try {
+      const response = await axios.get(`http://localhost:5050/medicines/${id}/description`);
+      setDescriptions((previous) => ({ ...previous, [id]: response.data.description }));
+    } catch (err) {
+      console.error('Failed to fetch medicine description:', err);
+    }
+  };
+
   const handleEdit = (medicine) => {
     setEditingMedicine({
       ...medicine,
@@ -96,6 +121,24 @@ function MedicineInventory() {
     setNewMedicine({ ...newMedicine, [e.target.name]: e.target.value });
   };
 
+  // Descriptions are generated in the background; reload the list once ready
+  const waitForDescription = async (id, attempts = 30) => {
+    for (let i = 0; i < attempts; i++) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      try {
+        const response = await axios.get(`http://localhost:5050/medicines/${id}/description`);
+        if (response.data.description_status !== 'pending') {
+          setDescriptions((previous) => ({ ...previous, [id]: response.data.description }));
+          fetchMedicines();
+          return;
+        }
+      } catch (err) {
+        console.error('Failed to check medicine description:', err);
+        return;
+      }
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     setLoading(true);
@@ -110,12 +153,15 @@ function MedicineInventory() {
     formData.append('username', user.fullName);
 
     try {
-      await axios.post('http://localhost:5050/medicines', formData, {
+      const response = await axios.post('http://localhost:5050/medicines', formData, {
         headers: { 'Content-Type': 'multipart/form-data' }
       });
       setNewMedicine({ name: '', quantity: '', expiryDate: '' });
       fetchMedicines();
       fetchExpiredMedicines();
+      if (response.data.description_status === 'pending') {
+        waitForDescription(response.data.id);
+      }
     } catch (err) {
       setError('Failed to add medicine');
     } finally {
@@ -220,7 +266,11 @@ function MedicineInventory() {
       <div className="medicine-list">
         <h3>Your Medicines</h3>
         {medicines.map((medicine) => (
-          <div key={medicine.id} className={`medicine-item ${isExpired(medicine.expiryDate) ? 'expired' : ''}`}>
+          <div
+            key={medicine.id}
+            className={`medicine-item ${isExpired(medicine.expiryDate) ? 'expired' : ''}`}
+            onMouseEnter={() => loadDescription(medicine.id)}
+          >
             {editingMedicine?.id === medicine.id ? (
               <form onSubmit={handleUpdateMedicine} className="edit-form">
                 <input
@@ -250,7 +300,10 @@ function MedicineInventory() {
                 <div className="medicine-info">
                   <h4>{medicine.name}</h4>
                   <div className="medicine-description">
-                    <p>{medicine.description}</p>
+                    <p>
+                      {descriptions[medicine.id]
+                        ?? (medicine.description_status === 'pending' ? 'Generating description...' : 'Loading description...')}
+                    </p>
                   </div>
                   <span>Qty: {medicine.quantity}</span>
                   <span>Expires: {new Date(medicine.expiryDate).toLocaleDateString()}</span>